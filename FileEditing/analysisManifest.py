@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+from importlib.metadata import version, PackageNotFoundError
+
+# Version des Manifest-Formats -> bei Änderungen am Aufbau hochzählen
+MANIFEST_VERSION = 1
+
+
+# Fingerprint der Analyse-Einstellungen: birdnetlib-Version, Species List und weitere Parameter
+# Ändert sich einer dieser Werte, sind alle gespeicherten Detections ungültig
+def analysisFingerprint(species_list, **settings):
+    try:
+        analyzer_version = version('birdnetlib')
+    except PackageNotFoundError:
+        analyzer_version = 'unknown'
+    payload = json.dumps({
+        'manifest': MANIFEST_VERSION,
+        'analyzer': analyzer_version,
+        'species': sorted(species_list),
+        'settings': settings,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# SHA-256 Hash über den Inhalt einer Datei -> wird blockweise gelesen
+def contentHash(file_path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Manifest laden -> bei fehlender Datei oder anderem Fingerprint wird ein leeres Manifest zurückgegeben
+def loadManifest(manifest_path, fingerprint):
+    empty = {'fingerprint': fingerprint, 'files': {}, 'detections': {}}
+    if not os.path.isfile(manifest_path):
+        return empty
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Manifest konnte nicht gelesen werden ({e}), starte neu")
+        return empty
+    if manifest.get('fingerprint') != fingerprint:
+        print("Analyzer-Version oder Species List geändert, alle Dateien werden neu analysiert")
+        return empty
+    return manifest
+
+
+# Manifest atomar speichern, damit ein Abbruch keine halbe Datei hinterlässt
+def saveManifest(manifest, manifest_path):
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+# Hash einer Datei ermitteln -> bei unveränderter Größe und Änderungszeit wird der gespeicherte Hash übernommen
+def cachedContentHash(manifest, file_path):
+    stat = os.stat(file_path)
+    entry = manifest['files'].get(file_path)
+    if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+        return entry['hash']
+    file_hash = contentHash(file_path)
+    manifest['files'][file_path] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': file_hash}
+    return file_hash
+
+
+# Einträge von Dateien entfernen, die nicht mehr im Verzeichnis liegen
+def pruneManifest(manifest, file_paths):
+    current = set(file_paths)
+    manifest['files'] = {path: entry for path, entry in manifest['files'].items() if path in current}
+    used_hashes = {entry['hash'] for entry in manifest['files'].values()}
+    manifest['detections'] = {h: d for h, d in manifest['detections'].items() if h in used_hashes}
@@ -0,0 +1,229 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from FileEditing.pcmCache import loadPCM
+from FileEditing.streamingAudio import streamWindows
+
+# Parameter von BirdNET: 48 kHz, 3-Sekunden-Fenster ohne Überlappung, Reste unter 1,5 Sekunden werden verworfen
+BIRDNET_SR = 48000
+WINDOW_SECONDS = 3.0
+MIN_SECONDS = 1.5
+WINDOW_SAMPLES = int(BIRDNET_SR * WINDOW_SECONDS)
+
+
+# Aufnahme wie in birdnetlib laden -> mono, 48 kHz, gleicher Resampler (kaiser_fast), über den PCM-Cache
+def loadRecording(file_path):
+    return loadPCM(file_path, sr=BIRDNET_SR, res_type='kaiser_fast')
+
+
+# Aufnahme in 3-Sekunden-Fenster schneiden -> kürzere Reste werden mit Nullen aufgefüllt
+def cutWindows(y):
+    windows = []
+    for start in range(0, len(y), WINDOW_SAMPLES):
+        chunk = y[start:start + WINDOW_SAMPLES]
+        if len(chunk) < int(MIN_SECONDS * BIRDNET_SR):
+            break
+        if len(chunk) < WINDOW_SAMPLES:
+            chunk = np.pad(chunk, (0, WINDOW_SAMPLES - len(chunk)))
+        start_time = start / BIRDNET_SR
+        windows.append((start_time, start_time + WINDOW_SECONDS, chunk))
+    return windows
+
+
+# Aufnahmen in Threads vorab dekodieren -> höchstens depth Dateien gleichzeitig im Speicher
+# Dateien, die sich nicht dekodieren lassen, werden ausgegeben, in failed gesammelt und übersprungen -> der Rest des Durchlaufs läuft weiter
+def prefetchRecordings(file_paths, workers, depth=None, load=loadRecording, failed=None):
+    depth = depth or 2 * workers
+
+    def decoded(file_path, future):
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Fehler beim Dekodieren von {file_path}, Datei wird übersprungen: {type(e).__name__}: {e}")
+            if failed is not None:
+                failed.append(file_path)
+            return None
+
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+        for file_path in file_paths:
+            pending.append((file_path, executor.submit(load, file_path)))
+            if len(pending) >= depth:
+                done_path, future = pending.popleft()
+                y = decoded(done_path, future)
+                if y is not None:
+                    yield done_path, y
+        while pending:
+            done_path, future = pending.popleft()
+            y = decoded(done_path, future)
+            if y is not None:
+                yield done_path, y
+
+
+# Eigener Interpreter für das BirdNET-Modell des Analyzers -> birdnetlib nutzt nur einen Thread, große Batches profitieren von mehreren
+def createInterpreter(analyzer, threads):
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ModuleNotFoundError:
+        from tensorflow import lite as tflite
+    interpreter = tflite.Interpreter(model_path=analyzer.model_path, num_threads=threads)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+# Ein Batch durch das TFLite-Modell schicken -> Rückgabe der Konfidenzen (Sigmoid wie in birdnetlib)
+def predictBatch(interpreter, analyzer, batch):
+    if tuple(interpreter.get_input_details()[0]['shape']) != batch.shape:
+        interpreter.resize_tensor_input(analyzer.input_layer_index, list(batch.shape))
+        interpreter.allocate_tensors()
+    interpreter.set_tensor(analyzer.input_layer_index, batch)
+    interpreter.invoke()
+    logits = interpreter.get_tensor(analyzer.output_layer_index)
+    return 1.0 / (1.0 + np.exp(-np.clip(logits, -15.0, 15.0)))
+
+
+# Konfidenzen eines Fensters in Detections im Format von birdnetlib umwandeln (absteigend nach Konfidenz)
+def windowDetections(scores, start_time, end_time, labels, allowed, min_conf):
+    detections = []
+    for idx in np.argsort(-scores, kind='stable'):
+        confidence = float(scores[idx])
+        if confidence <= min_conf:
+            break
+        if not allowed[idx]:
+            continue
+        scientific_name, common_name = labels[idx].split('_', 1)
+        detections.append({
+            'common_name': common_name,
+            'scientific_name': scientific_name,
+            'start_time': start_time,
+            'end_time': end_time,
+            'confidence': confidence,
+            'label': labels[idx],
+        })
+    return detections
+
+
+# Maske der erlaubten Labels -> ohne Species List sind wie in birdnetlib alle Arten erlaubt
+def allowedLabels(labels, species_list):
+    species = set(species_list)
+    return np.array([not species or label in species for label in labels])
+
+
+# Analyse vieler Aufnahmen mit großen Batches fester Größe
+# Fenster mehrerer Aufnahmen werden zusammengepackt, die Ergebnisse werden über (Datei, Start, Ende) zurückgeordnet
+# Liefert (Dateipfad, Detections), sobald alle Fenster einer Datei berechnet wurden; stats enthält Fenster, Dauer und Fenster/s
+# stats['decode_workers'] enthält pro Dekodier-Thread (Dateien, Sekunden), die Inferenz läuft in einem Thread (windows, inference_seconds)
+# Nicht dekodierbare Dateien werden nicht geliefert (stats['failed']) -> sie landen nicht im Manifest und werden beim nächsten Lauf erneut versucht
+# min_conf entspricht dem Standardwert von birdnetlib (Recording: min_conf=0.1)
+# Ohne interpreter wird der Interpreter des Analyzers verwendet
+def analyzeBatched(analyzer, file_paths, species_list, batch_size=128, min_conf=0.1, decode_workers=4, interpreter=None, stats=None):
+    interpreter = interpreter or analyzer.interpreter
+    labels = list(analyzer.labels)
+    allowed = allowedLabels(labels, species_list)
+    if stats is None:
+        stats = {}
+    stats.update({'files': 0, 'windows': 0, 'inference_seconds': 0.0, 'failed': [], 'decode_workers': {}})
+    decode_lock = threading.Lock()
+
+    # Dekodieren mit Zeitmessung pro Thread -> Grundlage der Zusammenfassung pro Worker
+    def timedLoad(file_path):
+        start = time.perf_counter()
+        try:
+            return loadRecording(file_path)
+        finally:
+            busy = time.perf_counter() - start
+            name = threading.current_thread().name
+            with decode_lock:
+                count, total = stats['decode_workers'].get(name, (0, 0.0))
+                stats['decode_workers'][name] = (count + 1, total + busy)
+    wall_start = time.perf_counter()
+
+    # Puffer eines Batches fester Größe -> gleiche Form bei jedem Aufruf, damit der Interpreter nicht neu alloziert
+    batch = np.zeros((batch_size, WINDOW_SAMPLES), dtype=np.float32)
+    # Herkunft jeder Zeile im Batch: (Dateipfad, Start, Ende)
+    origins = []
+    # Noch offene Fenster und gesammelte Detections pro Datei
+    remaining = {}
+    results = {}
+    # Dateien in Reihenfolge ihres Abschlusses
+    finished = deque()
+
+    def drain():
+        while finished:
+            done = finished.popleft()
+            del remaining[done]
+            stats['files'] += 1
+            yield done, results.pop(done)
+
+    def flush():
+        if not origins:
+            return
+        start = time.perf_counter()
+        # Der letzte, nicht volle Batch wird verkleinert statt leere Fenster mitzurechnen
+        scores = predictBatch(interpreter, analyzer, batch if len(origins) == batch_size else batch[:len(origins)])
+        stats['inference_seconds'] += time.perf_counter() - start
+        stats['windows'] += len(origins)
+        for row, (file_path, start_time, end_time) in enumerate(origins):
+            results[file_path].extend(windowDetections(scores[row], start_time, end_time, labels, allowed, min_conf))
+            remaining[file_path] -= 1
+            if remaining[file_path] == 0:
+                finished.append(file_path)
+        origins.clear()
+
+    # Dekodieren läuft in Threads parallel zur Inferenz
+    for file_path, y in prefetchRecordings(file_paths, decode_workers, load=timedLoad, failed=stats['failed']):
+        windows = cutWindows(y)
+        results[file_path] = []
+        remaining[file_path] = len(windows)
+        if not windows:
+            finished.append(file_path)
+        for start_time, end_time, chunk in windows:
+            batch[len(origins)] = chunk
+            origins.append((file_path, start_time, end_time))
+            if len(origins) == batch_size:
+                flush()
+        yield from drain()
+    flush()
+    yield from drain()
+
+    stats['seconds'] = time.perf_counter() - wall_start
+    stats['windows_per_second'] = stats['windows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+
+
+# Streaming-Analyse einer langen Aufnahme mit konstantem Speicherbedarf
+# Die Datei wird blockweise gelesen und resampled, Fenster werden in Batches fester Größe gesammelt
+# Nach jedem Batch werden die neuen Detections geliefert, sodass Ergebnisse schon vor dem Ende der Datei vorliegen
+# overlap (Sekunden) entspricht dem Parameter von birdnetlib, 0 bedeutet aneinandergrenzende Fenster
+def analyzeStreaming(analyzer, file_path, species_list, batch_size=128, min_conf=0.1, interpreter=None, block_seconds=60.0, overlap=0.0, stats=None):
+    interpreter = interpreter or analyzer.interpreter
+    labels = list(analyzer.labels)
+    allowed = allowedLabels(labels, species_list)
+    if stats is None:
+        stats = {}
+    stats.setdefault('windows', 0)
+    stats.setdefault('inference_seconds', 0.0)
+
+    batch = np.zeros((batch_size, WINDOW_SAMPLES), dtype=np.float32)
+    start_times = []
+
+    def flush():
+        start = time.perf_counter()
+        scores = predictBatch(interpreter, analyzer, batch if len(start_times) == batch_size else batch[:len(start_times)])
+        stats['inference_seconds'] += time.perf_counter() - start
+        stats['windows'] += len(start_times)
+        detections = []
+        for row, start_time in enumerate(start_times):
+            detections.extend(windowDetections(scores[row], start_time, start_time + WINDOW_SECONDS, labels, allowed, min_conf))
+        start_times.clear()
+        return detections
+
+    windows = streamWindows(file_path, BIRDNET_SR, WINDOW_SECONDS, WINDOW_SECONDS - overlap, block_seconds, MIN_SECONDS)
+    for start_time, chunk in windows:
+        batch[len(start_times)] = chunk
+        start_times.append(start_time)
+        if len(start_times) == batch_size:
+            yield flush()
+    if start_times:
+        yield flush()
@@ -1,16 +1,64 @@
 from birdnetlib import Recording
 from birdnetlib.analyzer import Analyzer
-import json
 import os
-import csv
+import time
+import math
+import multiprocessing
 from dotenv import load_dotenv
+from FileEditing.batchedInference import analyzeBatched, analyzeStreaming, createInterpreter
+from FileEditing.streamingAudio import audioDuration
+from FileEditing.detectionStore import openStore, replaceFileDetections, appendDetections, storedFiles, deleteMissingFiles, countDetections, exportCSV, commonNameForBird
+from FileEditing.analysisManifest import analysisFingerprint, loadManifest, saveManifest, cachedContentHash, pruneManifest
 
 load_dotenv()
 
 birdName = os.getenv('birdName')
-speciesName = "Eurasian Blue Tit"
-files_dir = f"../SoundFiles/{birdName}/"
-print(f"Using files directory: {files_dir}")
+# Vogelarten, deren Ordner in einem gemeinsamen Durchlauf analysiert werden -> z.B. birdNames="Amsel,Blaumeise", "all" für alle Ordner in ../SoundFiles
+# Ohne Angabe wird nur der Ordner von birdName analysiert
+birdNames = os.getenv('birdNames', birdName)
+sound_files_dir = "../SoundFiles/"
+# Anzahl paralleler Analyse-Prozesse -> 1 entspricht der seriellen Analyse
+analyzerWorkers = int(os.getenv('analyzerWorkers', '1'))
+# Analyse-Engine: "batched" packt Fenster vieler Aufnahmen in große Batches, "recording" analysiert jede Datei einzeln über birdnetlib
+analysisEngine = os.getenv('analysisEngine', 'batched')
+# Anzahl der 3-Sekunden-Fenster pro Modellaufruf, Threads zum Dekodieren und Threads des TFLite-Interpreters (nur bei "batched")
+analyzerBatchSize = int(os.getenv('analyzerBatchSize', '128'))
+decodeWorkers = int(os.getenv('decodeWorkers', '4'))
+interpreterThreads = int(os.getenv('interpreterThreads', str(os.cpu_count() or 1)))
+# Aufnahmen ab dieser Länge (Sekunden) werden blockweise gestreamt statt vollständig geladen -> konstanter Speicherbedarf
+streamingMinSeconds = float(os.getenv('streamingMinSeconds', '600'))
+streamingBlockSeconds = float(os.getenv('streamingBlockSeconds', '60'))
+
+
+# Ausgabeziele pro Vogelart: Ordner, englischer Name, Manifest und Datenbank
+def speciesTargets(names=birdNames):
+    if names == 'all':
+        names = sorted(entry.name for entry in os.scandir(sound_files_dir) if entry.is_dir())
+    else:
+        names = [name.strip() for name in names.split(',') if name.strip()]
+    # speciesName überschreibt den englischen Namen nur bei einer einzelnen Vogelart
+    override = os.getenv('speciesName') if len(names) == 1 else None
+    targets = []
+    for name in names:
+        try:
+            # Englischer Name der Vogelart -> wird aus dem deutschen Ordnernamen über die BirdNET Labels bestimmt
+            speciesName = override or commonNameForBird(name)
+        except ValueError as e:
+            print(f"Ordner {name} wird übersprungen: {e}")
+            continue
+        files_dir = f"{sound_files_dir}{name}/"
+        targets.append({
+            'birdName': name,
+            'speciesName': speciesName,
+            'files_dir': files_dir,
+            # Manifest mit den Detections pro Datei-Hash -> bei erneutem Lauf werden nur neue oder geänderte Dateien analysiert
+            'manifest_path': os.path.join(files_dir, "birdnet.manifest"),
+            # Datenbank mit allen Detections -> ersetzt die JSON-Dateien pro Aufnahme und die data.csv
+            'store_path': os.path.join(files_dir, "detections.sqlite"),
+        })
+        print(f"Using files directory: {files_dir}")
+    return targets
+
 
 species_list = []
 
@@ -22,76 +70,242 @@ with open('../species_list.txt', 'r', encoding='utf-8') as f:
             species = line.split('_')[0]
             species_list.append(line)
 
-# Methode zum Erstellen von JSON-Dateien mit den Ergebnissen der Analyse durch BirdNET
-def createJSONFiles():
+# Analyzer des aktuellen Prozesses -> wird pro Worker nur einmal geladen statt für jede Datei
+analyzer = None
+# Interpreter für die Batch- und Streaming-Analyse -> mit mehreren Threads, da birdnetlib nur einen nutzt
+interpreter = None
+
+
+# Initialisierung eines Workers -> das BirdNET TFLite-Modell wird einmalig pro Prozess geladen
+def initAnalyzer(species_list):
+    global analyzer
+    if analyzer is None:
+        analyzer = Analyzer(custom_species_list=species_list)
+
+
+# Analyzer und Interpreter für die Batch- und Streaming-Analyse laden
+def initInterpreter():
+    global interpreter
+    initAnalyzer(species_list)
+    if interpreter is None:
+        interpreter = analyzer.interpreter if interpreterThreads <= 1 else createInterpreter(analyzer, interpreterThreads)
+
+
+# Analyse einer einzelnen Datei mit dem Analyzer des aktuellen Prozesses
+def analyzeFile(file_path):
+    start = time.perf_counter()
+    # Nutzen des BirdNET Repos
+    # übernommen von: https://joeweiss.github.io/birdnetlib/#using-birdnet-analyzer
+    recording = Recording(analyzer, file_path)
+    recording.analyze()
+    # Anzahl der 3-Sekunden-Fenster für den Vergleich mit der Batch-Engine
+    windows = math.ceil(getattr(recording, 'duration', 0) / 3.0)
+    return file_path, recording.detections, os.getpid(), time.perf_counter() - start, windows
+
+
+# Alle mp3-Dateien im Verzeichnis sammeln
+def collectMP3Files(files_dir):
+    mp3_files = []
     for root, dirs, files in os.walk(files_dir):
         # Herausfiltern aller mp3-Dateien im Verzeichnis
         for file in files:
             if file.endswith('.mp3'):
                 file_path = os.path.join(root, file)
-                fileName = os.path.splitext(file)[0]
                 if not os.path.isfile(file_path):
                     print(f"Datei nicht gefunden: {file_path}")
                     continue
-                print(f"Processing file: {fileName}")
-
-                # Nutzen des BirdNET Repos
-                # übernommen von: https://joeweiss.github.io/birdnetlib/#using-birdnet-analyzer
-                analyzer = Analyzer(custom_species_list=species_list)
-                recording = Recording(analyzer, file_path)
-                recording.analyze()
-
-                # Speichern der Ergebnisse in einer JSON-Datei
-                result = recording.detections
-                result_json = json.dumps(result, indent=4)
-                # Für jede mp3-Datei wird eine JSON-Datei erstellt
-                output_file = os.path.join(root, f"{fileName}.json")
-                with open(output_file, 'w') as json_file:
-                    json_file.write(result_json)
-                print(f"Results saved to: {output_file}")
-
-
-# Methode zum Erstellen einer CSV-Datei mit der Zusammenfassung der Ergebnisse der Analyse
-def createCSVFile():
-    csv_file = open(os.path.join(files_dir, "data.csv"), 'w', newline='', encoding='utf-8')
-    csv_writer = csv.writer(csv_file)
-    # CSV-Header
-    csv_writer.writerow(['FileName', 'Common Name', 'Country', 'SoundType', 'Start Time', 'End Time', 'Confidence'])
-    for root, dirs, files in os.walk(files_dir):
-        for file in files:
-            if file.endswith('.json'):
-                file_path = os.path.join(root, file)
-                fileName = os.path.splitext(file)[0]
-                with open(file_path, 'r', encoding='utf-8') as json_file:
-                    data = json.load(json_file)
-                    # soundType extrahieren: Wort vor _[A-Z]_result
-                    parts = fileName.split('_')
-                    # soundType und country aus Filenamen extrahieren -> generiert von ChatGPT
-                    soundType = parts[-2] if len(parts) >= 3 else ""
-                    country = parts[-3] if len(parts) >= 3 else ""
-                    for detection in data:
-                        # Überprüfen, ob die Erkennung dem gesuchten Vogel entspricht
-                        if detection.get("common_name", "") == speciesName:
-                            common_name = detection.get("common_name", "")
-                            start_time = detection.get("start_time", "")
-                            end_time = detection.get("end_time", "")
-                            confidence = detection.get("confidence", 0)
-                            csv_writer.writerow([fileName, common_name, country, soundType, start_time, end_time, confidence])
-
-    csv_file.close()
-
-
-# Löschen aller bestehenden JSON-Dateien
-def deleteallJSONFiles():
+                mp3_files.append(file_path)
+    return mp3_files
+
+
+# Name einer Aufnahme ohne Verzeichnis und Dateiendung -> Schlüssel in der Datenbank
+def recordingName(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+# Ausgabe des Durchsatzes pro Worker -> worker_stats: Name -> (Anzahl, Analysezeit, Einheit), z.B. Dateien oder Fenster
+def printWorkerSummary(worker_stats, wall_time):
+    print(f"Analyse abgeschlossen in {wall_time:.1f}s")
+    for name, (count, busy, unit) in worker_stats.items():
+        rate = count / busy if busy > 0 else 0.0
+        print(f"{name}: {count} {unit}, {busy:.1f}s Analysezeit, {rate:.2f} {unit}/s")
+
+
+# Ausgabe der Fenster pro Sekunde -> Vergleichswert zwischen den Analyse-Engines
+def printThroughput(engine, files, windows, wall_time):
+    if wall_time > 0:
+        print(f"Engine {engine}: {files} Dateien, {windows} Fenster in {wall_time:.1f}s -> {files / wall_time:.2f} Dateien/s, {windows / wall_time:.1f} Fenster/s")
+
+
+# Analyse jeder Datei einzeln über birdnetlib -> workers > 1 verteilt die Dateien auf einen Prozesspool
+def analyzePerRecording(file_paths, workers):
+    worker_stats = {}
+    windows = 0
+    wall_start = time.perf_counter()
+    if workers > 1:
+        pool = multiprocessing.Pool(min(workers, len(file_paths)), initializer=initAnalyzer, initargs=(species_list,))
+        results = pool.imap_unordered(analyzeFile, file_paths)
+    else:
+        pool = None
+        initAnalyzer(species_list)
+        results = map(analyzeFile, file_paths)
+
+    try:
+        for file_path, detections, pid, busy, file_windows in results:
+            count, total_busy = worker_stats.get(pid, (0, 0.0))
+            worker_stats[pid] = (count + 1, total_busy + busy)
+            windows += file_windows
+            yield file_path, detections
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    wall_time = time.perf_counter() - wall_start
+    printWorkerSummary({f"Worker {pid}": (count, busy, 'Dateien') for pid, (count, busy) in sorted(worker_stats.items())}, wall_time)
+    printThroughput('recording', len(file_paths), windows, wall_time)
+
+
+# Analyse mit der Batch-Engine -> ein Analyzer, Fenster vieler Aufnahmen in Batches fester Größe
+def analyzeWithBatches(file_paths):
+    initInterpreter()
+    stats = {}
+    yield from analyzeBatched(analyzer, file_paths, species_list, batch_size=analyzerBatchSize, decode_workers=decodeWorkers, interpreter=interpreter, stats=stats)
+    # Worker der Batch-Engine: die Threads zum Dekodieren und der Interpreter
+    worker_stats = {f"Dekodierung {index}": (count, busy, 'Dateien') for index, (count, busy) in enumerate((value for _, value in sorted(stats['decode_workers'].items())), start=1)}
+    worker_stats['Inferenz'] = (stats['windows'], stats['inference_seconds'], 'Fenster')
+    printWorkerSummary(worker_stats, stats['seconds'])
+    printThroughput('batched', stats['files'], stats['windows'], stats['seconds'])
+    if stats['failed']:
+        print(f"{len(stats['failed'])} Dateien konnten nicht dekodiert werden -> nicht im Manifest, beim nächsten Lauf erneut versucht")
+
+
+# Streaming-Analyse langer Aufnahmen -> Detections werden nach jedem Batch an alle Ziele angehängt
+# Rückgabe aller Detections der Datei für das Manifest
+def analyzeLongRecording(file_path, routes):
+    initInterpreter()
+    stats = {}
+    start = time.perf_counter()
+    for target, target_file in routes:
+        replaceFileDetections(target['conn'], recordingName(target_file), [])
+    detections = []
+    for new_detections in analyzeStreaming(analyzer, file_path, species_list, batch_size=analyzerBatchSize, interpreter=interpreter, block_seconds=streamingBlockSeconds, stats=stats):
+        for target, target_file in routes:
+            appendDetections(target['conn'], recordingName(target_file), new_detections)
+        detections.extend(new_detections)
+        print(f"Streaming {recordingName(file_path)}: {stats['windows'] * 3.0 / 60:.1f} min analysiert")
+    wall_time = time.perf_counter() - start
+    # Lesen, Resampling und Inferenz laufen nacheinander im selben Thread -> Dekodierung ist die Zeit außerhalb der Inferenz
+    printWorkerSummary({'Dekodierung': (1, wall_time - stats['inference_seconds'], 'Dateien'),
+                        'Inferenz': (stats['windows'], stats['inference_seconds'], 'Fenster')}, wall_time)
+    printThroughput('streaming', 1, stats['windows'], wall_time)
+    return detections
+
+
+# Methode zum Befüllen der Datenbanken mit den Ergebnissen der Analyse durch BirdNET
+# Die Aufnahmen aller Vogelarten werden in einem Durchlauf analysiert, jede Datei (gleicher Inhalt) genau einmal
+# Die Detections werden direkt nach der Analyse in die Datenbank des Ordners geschrieben, aus dem die Aufnahme stammt
+def createDetectionStore(targets, workers=analyzerWorkers, engine=analysisEngine):
+    fingerprint = analysisFingerprint(species_list, engine=engine)
+    # Zu analysierende Dateien pro Hash und alle Ziele (Ordner, Dateipfad) mit diesem Hash
+    pending = {}
+    routes = {}
+    file_hashes = {}
+    for target in targets:
+        mp3_files = collectMP3Files(target['files_dir'])
+        target['conn'] = openStore(target['store_path'])
+        # Detections von Aufnahmen, die nicht mehr vorhanden sind, werden entfernt
+        deleteMissingFiles(target['conn'], [recordingName(file_path) for file_path in mp3_files])
+        in_store = storedFiles(target['conn'])
+
+        # Bereits analysierte Dateien (gleicher Inhalt, gleiche Analyzer-Version und Species List) werden übersprungen
+        target['manifest'] = manifest = loadManifest(target['manifest_path'], fingerprint)
+        for file_path in mp3_files:
+            file_hashes[file_path] = cachedContentHash(manifest, file_path)
+        pruneManifest(manifest, mp3_files)
+        cached_files = 0
+        for file_path in mp3_files:
+            file_hash = file_hashes[file_path]
+            cached = manifest['detections'].get(file_hash)
+            if cached is None:
+                pending.setdefault(file_hash, file_path)
+                routes.setdefault(file_hash, []).append((target, file_path))
+            else:
+                cached_files += 1
+                if recordingName(file_path) not in in_store:
+                    replaceFileDetections(target['conn'], recordingName(file_path), cached)
+        print(f"{target['birdName']}: {cached_files} Dateien aus dem Manifest übernommen, {len(mp3_files) - cached_files} Dateien werden analysiert")
+
+    # Lange Aufnahmen werden gestreamt, alle anderen über die gewählte Engine analysiert
+    long_files = []
+    for file_hash, file_path in list(pending.items()):
+        duration = audioDuration(file_path)
+        if duration is not None and duration >= streamingMinSeconds:
+            long_files.append(file_path)
+            del pending[file_hash]
+
+    try:
+        for file_path in long_files:
+            file_hash = file_hashes[file_path]
+            detections = analyzeLongRecording(file_path, routes[file_hash])
+            for target, _ in routes[file_hash]:
+                target['manifest']['detections'][file_hash] = detections
+                saveManifest(target['manifest'], target['manifest_path'])
+
+        if pending:
+            if engine == 'batched':
+                results = analyzeWithBatches(list(pending.values()))
+            else:
+                results = analyzePerRecording(list(pending.values()), workers)
+
+            for done, (file_path, detections) in enumerate(results, start=1):
+                print(f"Processing file: {recordingName(file_path)}")
+                file_hash = file_hashes[file_path]
+                # Weiterleiten der Detections an jeden Ordner, der diese Aufnahme enthält
+                for target, target_file in routes[file_hash]:
+                    replaceFileDetections(target['conn'], recordingName(target_file), detections)
+                    target['manifest']['detections'][file_hash] = detections
+                # Zwischenspeichern, damit bei einem Abbruch der bisherige Fortschritt erhalten bleibt
+                if done % 50 == 0:
+                    for target in targets:
+                        saveManifest(target['manifest'], target['manifest_path'])
+    finally:
+        for target in targets:
+            saveManifest(target['manifest'], target['manifest_path'])
+
+    # Zusammenfassung pro Vogelart
+    for target in targets:
+        detections = countDetections(target['conn'], species=target['speciesName'])
+        print(f"{target['birdName']} ({target['speciesName']}): {detections} Detections, Results saved to: {target['store_path']}")
+        target['conn'].close()
+
+
+# Methode zum Erstellen einer CSV-Datei mit der Zusammenfassung der Ergebnisse der Analyse -> Export aus der Datenbank
+def createCSVFile(target):
+    conn = openStore(target['store_path'])
+    exportCSV(conn, os.path.join(target['files_dir'], "data.csv"), target['speciesName'])
+    conn.close()
+
+
+# Löschen aller bestehenden JSON-Dateien -> Überbleibsel der früheren Ausgabe pro Aufnahme
+def deleteallJSONFiles(files_dir):
     for root, dirs, files in os.walk(files_dir):
         for file in files:
             if file.endswith('.json'):
                 os.remove(os.path.join(root, file))
 
-# Löschen aller bestehenden JSON-Dateien vor der Analyse
-deleteallJSONFiles()
-createJSONFiles()
-createCSVFile()
+
+# Aufruf nur im Hauptprozess, damit die Worker des Prozesspools die Analyse nicht erneut starten
+if __name__ == '__main__':
+    targets = speciesTargets()
+    # Löschen aller bestehenden JSON-Dateien vor der Analyse
+    for target in targets:
+        deleteallJSONFiles(target['files_dir'])
+    createDetectionStore(targets)
+    # data.csv wird nur noch auf Wunsch exportiert, generateSplitFiles() liest direkt aus der Datenbank
+    if os.getenv('exportCSV', '0') == '1':
+        for target in targets:
+            createCSVFile(target)
 
 
 
@@ -0,0 +1,131 @@
+import csv
+import os
+import sqlite3
+
+# Verzeichnis mit den BirdNET Labels in verschiedenen Sprachen
+LABELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models', 'labels')
+
+# Tabelle mit typisierten Spalten für alle Detections -> Indizes erlauben gefilterte Abfragen ohne alles zu laden
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS detections (
+    file TEXT NOT NULL,
+    country TEXT NOT NULL,
+    sound_type TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    confidence REAL NOT NULL,
+    species TEXT NOT NULL,
+    scientific_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_species ON detections (species, sound_type, file);
+CREATE INDEX IF NOT EXISTS idx_detections_file ON detections (file);
+'''
+
+CSV_HEADER = ['FileName', 'Common Name', 'Country', 'SoundType', 'Start Time', 'End Time', 'Confidence']
+
+
+# Englischen Namen einer Vogelart über ihren deutschen Namen (= Ordnername) aus den BirdNET Labels ermitteln
+def commonNameForBird(birdName, labels_dir=LABELS_DIR):
+    scientific_name = None
+    with open(os.path.join(labels_dir, 'de.txt'), 'r', encoding='utf-8') as f:
+        for line in f:
+            scientific, german = line.strip().split('_', 1)
+            if german == birdName:
+                scientific_name = scientific
+                break
+    if scientific_name is None:
+        raise ValueError(f"Vogelart {birdName} nicht in den BirdNET Labels gefunden")
+    with open(os.path.join(labels_dir, 'en_us.txt'), 'r', encoding='utf-8') as f:
+        for line in f:
+            scientific, common = line.strip().split('_', 1)
+            if scientific == scientific_name:
+                return common
+    raise ValueError(f"Kein englischer Name für {scientific_name} gefunden")
+
+
+# soundType und country aus Filenamen extrahieren -> generiert von ChatGPT
+def parseFileName(fileName):
+    parts = fileName.split('_')
+    soundType = parts[-2] if len(parts) >= 3 else ""
+    country = parts[-3] if len(parts) >= 3 else ""
+    return country, soundType
+
+
+# Datenbank öffnen und Tabelle bei Bedarf anlegen
+def openStore(store_path):
+    conn = sqlite3.connect(store_path)
+    conn.row_factory = sqlite3.Row
+    # WAL-Modus -> Lesen ist während des Schreibens weiterhin möglich
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# Detections im Format von birdnetlib in Zeilen der Tabelle umwandeln
+def detectionRows(fileName, detections):
+    country, soundType = parseFileName(fileName)
+    return [(fileName, country, soundType, float(d['start_time']), float(d['end_time']), float(d['confidence']),
+             d['common_name'], d.get('scientific_name', '')) for d in detections]
+
+
+# Detections einer Aufnahme speichern -> vorhandene Einträge der Datei werden ersetzt, damit ein erneuter Lauf keine Duplikate erzeugt
+def replaceFileDetections(conn, fileName, detections):
+    with conn:
+        conn.execute('DELETE FROM detections WHERE file = ?', (fileName,))
+        conn.executemany('INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?, ?)', detectionRows(fileName, detections))
+
+
+# Weitere Detections einer Aufnahme anhängen -> für die Streaming-Analyse, die Ergebnisse schrittweise liefert
+def appendDetections(conn, fileName, detections):
+    with conn:
+        conn.executemany('INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?, ?)', detectionRows(fileName, detections))
+
+
+# Namen aller Dateien mit gespeicherten Detections -> optional nur Dateien mit Detections einer Vogelart
+def storedFiles(conn, species=None):
+    if species is None:
+        return {row['file'] for row in conn.execute('SELECT DISTINCT file FROM detections')}
+    return {row['file'] for row in conn.execute('SELECT DISTINCT file FROM detections WHERE species = ?', (species,))}
+
+
+# Einträge von Dateien löschen, die nicht mehr vorhanden sind
+def deleteMissingFiles(conn, fileNames):
+    stale = storedFiles(conn) - set(fileNames)
+    with conn:
+        conn.executemany('DELETE FROM detections WHERE file = ?', [(name,) for name in stale])
+    return stale
+
+
+# Anzahl der Detections -> optional nur einer Vogelart
+def countDetections(conn, species=None):
+    if species is None:
+        return conn.execute('SELECT COUNT(*) FROM detections').fetchone()[0]
+    return conn.execute('SELECT COUNT(*) FROM detections WHERE species = ?', (species,)).fetchone()[0]
+
+
+# Gefilterte Abfrage -> liefert einen Cursor, die Zeilen werden erst beim Iterieren geladen
+# Sortierung nach soundType, Datei und Startzeit, damit die Zeilen einer Datei direkt gruppiert werden können
+def queryDetections(conn, species=None, soundType=None, minConfidence=None):
+    conditions = []
+    params = []
+    if species is not None:
+        conditions.append('species = ?')
+        params.append(species)
+    if soundType is not None:
+        conditions.append('sound_type = ?')
+        params.append(soundType)
+    if minConfidence is not None:
+        conditions.append('confidence >= ?')
+        params.append(minConfidence)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return conn.execute(f'SELECT * FROM detections {where} ORDER BY sound_type, file, start_time', params)
+
+
+# Export der Detections einer Vogelart im bisherigen Format der data.csv
+def exportCSV(conn, csv_path, species):
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(CSV_HEADER)
+        for row in queryDetections(conn, species=species):
+            csv_writer.writerow([row['file'], row['species'], row['country'], row['sound_type'],
+                                 row['start_time'], row['end_time'], row['confidence']])
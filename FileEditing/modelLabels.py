@@ -0,0 +1,25 @@
+import json
+import os
+
+# Klassen eines exportierten Modells in der Reihenfolge des Trainings -> als JSON neben dem .keras-Modell
+# Wird von trainEngine.exportHead geschrieben und von allen Skripten in Testing gelesen, damit die Klassen nur an einer Stelle stehen
+
+
+# Pfad der Labels eines Modells -> gilt auch für die daraus exportierten TFLite-Modelle
+def labelsPath(model_path):
+    return f"{os.path.splitext(model_path)[0]}_labels.json"
+
+
+def writeClassNames(model_path, label_names, head_name=None):
+    with open(labelsPath(model_path), 'w', encoding='utf-8') as f:
+        json.dump({'head': head_name, 'label_names': list(label_names)}, f, indent=2)
+
+
+# Klassen des Modells unter model_path (.keras) -> Fehler, wenn das Modell ohne Labels exportiert wurde
+def classNames(model_path):
+    path = labelsPath(model_path)
+    if not os.path.isfile(path):
+        raise ValueError(f"Keine Labels für {model_path} gefunden -> Modell mit trainEngine neu exportieren "
+                         f"oder {path} anlegen ({{\"label_names\": [...]}} in der Reihenfolge des Trainings)")
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(json.load(f)['label_names'])
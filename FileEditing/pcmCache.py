@@ -0,0 +1,167 @@
+import os
+import shutil
+import numpy as np
+import librosa
+from FileEditing.analysisManifest import contentHash
+from FileEditing.segmentIndex import parseSegmentRef
+from FileEditing.streamingAudio import audioDuration
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Cache für dekodierte Audiodaten (mono, float32) als .npy-Dateien -> Schlüssel ist der Hash des Dateiinhalts und die Sampling Rate
+# Jede Stufe (Analyse, Konvertierung, Splitten, Training, Prediction) liest hierüber, dekodiert und resampled wird nur beim ersten Zugriff
+PCM_CACHE_ENABLED = os.getenv('pcmCache', '1') == '1'
+PCM_CACHE_DIR = os.getenv('pcmCacheDir', '../cache/pcm')
+# Maximale Größe des Caches -> bei Überschreitung werden die am längsten nicht genutzten Einträge gelöscht (LRU)
+PCM_CACHE_MAX_BYTES = int(float(os.getenv('pcmCacheMaxGB', '20')) * 1024 ** 3)
+# Längere Aufnahmen (Sekunden) werden nicht vollständig dekodiert, sondern nur der angefragte Ausschnitt gelesen -> begrenzter Speicherbedarf
+PCM_CACHE_MAX_SECONDS = float(os.getenv('pcmCacheMaxSeconds', '1800'))
+DEFAULT_SR = 32000
+DEFAULT_RES_TYPE = 'soxr_hq'
+
+# Hashes bereits gelesener Dateien im aktuellen Prozess -> Schlüssel (Pfad, Größe, Änderungszeit)
+_hashes = {}
+# Aktuelle Größe des Caches in Bytes -> wird beim ersten Schreiben einmalig ermittelt
+_cache_bytes = None
+
+
+# Hash einer Datei, bei unveränderter Größe und Änderungszeit aus dem Speicher
+def fileHash(file_path):
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _hashes:
+        _hashes[key] = contentHash(file_path)
+    return _hashes[key]
+
+
+# Schlüssel der Audiodaten -> Hash des Dateiinhalts, bei Verweisen auf Ausschnitte zusätzlich Start und Ende
+def audioKey(file_path):
+    path, start, end = parseSegmentRef(file_path)
+    key = fileHash(path)
+    return key if start is None else f"{key}_{start}_{end}"
+
+
+# Pfad des Cache-Eintrags einer Datei -> ein anderer Resampler als der Standard ist Teil des Schlüssels
+def cachePath(file_path, sr=DEFAULT_SR, res_type=DEFAULT_RES_TYPE):
+    suffix = '' if res_type == DEFAULT_RES_TYPE else f"_{res_type}"
+    return os.path.join(PCM_CACHE_DIR, f"{fileHash(file_path)}_{sr}{suffix}.npy")
+
+
+# Ausschnitt in Sekunden aus einem Array schneiden -> entspricht offset/duration von librosa.load
+def sliceSeconds(y, sr, offset=0.0, duration=None):
+    start = int(round(offset * sr))
+    if duration is None:
+        return y[start:]
+    return y[start:start + int(round(duration * sr))]
+
+
+# Audiodatei laden (mono, Sampling Rate sr) -> aus dem Cache per Memory Mapping oder einmalig dekodieren und ablegen
+# Das zurückgegebene Array ist schreibgeschützt, Ausschnitte über offset/duration kopieren keine Daten
+# Statt eines Pfads ist auch ein Verweis auf einen Ausschnitt ("Pfad#Start_Ende", siehe segmentIndex) möglich -> offset ist dann relativ zum Ausschnitt
+def loadPCM(file_path, sr=DEFAULT_SR, offset=0.0, duration=None, res_type=DEFAULT_RES_TYPE):
+    file_path, start, end = parseSegmentRef(file_path)
+    if start is not None:
+        remaining = end - start - offset
+        duration = remaining if duration is None else min(duration, remaining)
+        offset += start
+    if not PCM_CACHE_ENABLED:
+        y, _ = librosa.load(file_path, sr=sr, mono=True, offset=offset, duration=duration, res_type=res_type)
+        return y
+    path = cachePath(file_path, sr, res_type)
+    try:
+        y = np.load(path, mmap_mode='r')
+        # Zugriffszeit aktualisieren -> Grundlage für die LRU-Verdrängung
+        os.utime(path)
+    except (FileNotFoundError, ValueError):
+        duration_total = audioDuration(file_path)
+        if duration_total is not None and duration_total > PCM_CACHE_MAX_SECONDS:
+            y, _ = librosa.load(file_path, sr=sr, mono=True, offset=offset, duration=duration, res_type=res_type)
+            return y
+        y, _ = librosa.load(file_path, sr=sr, mono=True, res_type=res_type)
+        writeEntry(path, y)
+    return sliceSeconds(y, sr, offset, duration)
+
+
+# Bereits vorhandene Audiodaten einer (neu geschriebenen) Datei im Cache ablegen, damit sie nicht erneut dekodiert werden muss
+def storePCM(file_path, y, sr=DEFAULT_SR):
+    if PCM_CACHE_ENABLED:
+        writeEntry(cachePath(file_path, sr), y)
+
+
+# Eintrag einer Quelldatei zusätzlich unter dem Hash einer abgeleiteten Datei ablegen (z.B. mp3 -> wav mit gleichem Inhalt)
+def aliasPCM(source_path, target_path, sr=DEFAULT_SR):
+    if not PCM_CACHE_ENABLED:
+        return
+    source = cachePath(source_path, sr)
+    target = cachePath(target_path, sr)
+    if os.path.exists(target) or not os.path.exists(source):
+        return
+    try:
+        # Hardlink belegt keinen zusätzlichen Speicher -> die Größe des Caches bleibt unverändert
+        os.link(source, target)
+    except OSError:
+        # Nur eine Kopie (z.B. anderes Dateisystem) belegt zusätzlichen Speicher
+        shutil.copyfile(source, target)
+        _addBytes(os.path.getsize(target))
+
+
+# Eintrag atomar schreiben -> parallele Prozesse sehen nie eine halbe Datei
+def writeEntry(path, y):
+    os.makedirs(PCM_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(y, dtype=np.float32))
+    os.replace(tmp_path, path)
+    _addBytes(os.path.getsize(path))
+
+
+# Alle Einträge des Caches mit Größe, letzter Nutzung und Pfaden
+# Hardlinks (aliasPCM) teilen sich eine Datei -> pro Inode ein Eintrag, die Größe wird nur einmal gezählt
+def _entries():
+    entries = {}
+    for entry in os.scandir(PCM_CACHE_DIR):
+        if entry.name.endswith('.npy'):
+            stat = os.stat(entry.path)
+            # Ohne Inode (manche Dateisysteme) zählt jeder Pfad einzeln
+            key = (stat.st_dev, stat.st_ino) if stat.st_ino else entry.path
+            if key in entries:
+                entries[key][2].append(entry.path)
+            else:
+                entries[key] = (stat.st_mtime, stat.st_size, [entry.path])
+    return list(entries.values())
+
+
+# Größe des Caches fortschreiben und bei Überschreitung des Limits verdrängen
+def _addBytes(size):
+    global _cache_bytes
+    if _cache_bytes is None:
+        _cache_bytes = sum(size for _, size, _ in _entries())
+    else:
+        _cache_bytes += size
+    if _cache_bytes > PCM_CACHE_MAX_BYTES:
+        evict()
+
+
+# LRU-Verdrängung: die am längsten nicht genutzten Einträge löschen, bis der Cache unter 90% des Limits liegt
+def evict(max_bytes=None):
+    global _cache_bytes
+    max_bytes = PCM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, paths in entries:
+        if total <= 0.9 * max_bytes:
+            break
+        # Speicher wird erst frei, wenn alle Hardlinks eines Eintrags gelöscht sind
+        removed = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                # Datei wird gerade von einem anderen Prozess gelesen (Windows) -> überspringen
+                continue
+        if removed == len(paths):
+            total -= size
+    _cache_bytes = total
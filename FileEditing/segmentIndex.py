@@ -0,0 +1,47 @@
+import csv
+import os
+import re
+
+# Index der Ausschnitte pro Vogelart -> statt einer WAV-Datei pro Ausschnitt bleibt nur die normalisierte Ursprungsdatei erhalten
+SEGMENT_INDEX_FILE = 'segment_index.csv'
+SEGMENT_INDEX_HEADER = ['Label', 'Path', 'Start Time', 'End Time']
+# Zeitangaben eines Verweises nach dem letzten '#' -> nur "Start_Ende" in Sekunden gilt als Ausschnitt
+SEGMENT_BOUNDS = re.compile(r'^(\d+(?:\.\d+)?)_(\d+(?:\.\d+)?)$')
+
+
+# Verweis auf einen Ausschnitt einer Datei -> "Pfad#Start_Ende", kann überall statt eines Dateipfads verwendet werden
+# Der Ordner des Pfads bleibt der SoundType, sodass os.path.dirname weiterhin das Label liefert
+def segmentRef(path, start, end):
+    return f"{path}#{start}_{end}"
+
+
+# Verweis zerlegen -> (Pfad, Start, Ende), bei einem normalen Dateipfad (Pfad, None, None)
+def parseSegmentRef(ref):
+    path, sep, bounds = ref.rpartition('#')
+    match = SEGMENT_BOUNDS.match(bounds) if sep else None
+    # Ohne gültige Zeitangaben ist '#' Teil eines gewöhnlichen Dateinamens
+    if match is None:
+        return ref, None, None
+    return path, float(match.group(1)), float(match.group(2))
+
+
+# Index schreiben -> groups enthält pro Ursprungsdatei (Pfad, [(Ausgabedatei, Start, Ende), ...])
+def writeSegmentIndex(files_dir, groups):
+    index_path = os.path.join(files_dir, SEGMENT_INDEX_FILE)
+    count = 0
+    with open(index_path, 'w', newline='', encoding='utf-8') as index_file:
+        writer = csv.writer(index_file)
+        writer.writerow(SEGMENT_INDEX_HEADER)
+        for input_file, segment_list in groups:
+            label = os.path.basename(os.path.dirname(input_file))
+            for _, start, end in segment_list:
+                writer.writerow([label, input_file, start, end])
+                count += 1
+    return index_path, count
+
+
+# Index lesen -> liefert (Label, Verweis) für jeden Ausschnitt
+def readSegmentIndex(files_dir):
+    with open(os.path.join(files_dir, SEGMENT_INDEX_FILE), 'r', newline='', encoding='utf-8') as index_file:
+        for row in csv.DictReader(index_file):
+            yield row['Label'], segmentRef(row['Path'], float(row['Start Time']), float(row['End Time']))
@@ -1,37 +1,156 @@
 from pydub import AudioSegment
 import os
-import pandas as pd
-import librosa
 import soundfile as sf
 from dotenv import load_dotenv
 import glob
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from FileEditing.pcmCache import loadPCM, storePCM, aliasPCM, sliceSeconds, PCM_CACHE_ENABLED, PCM_CACHE_MAX_SECONDS
+from FileEditing.streamingAudio import audioDuration
+from FileEditing.detectionStore import openStore, queryDetections, storedFiles, commonNameForBird
+from FileEditing.segmentIndex import writeSegmentIndex
 
 load_dotenv()
 birdName = os.getenv('birdName')
+speciesName = os.getenv('speciesName') or commonNameForBird(birdName)
 
 files_dir = f"../SoundFiles/{birdName}/"
+# Anzahl paralleler Prozesse beim Konvertieren und Splitten -> 1 entspricht der seriellen Verarbeitung
+splitWorkers = int(os.getenv('splitWorkers', str(os.cpu_count() or 1)))
+SR = 32000
+# Ausschnitte nur als Index (Datei, Start, Ende) speichern statt als einzelne WAV-Dateien -> die Ursprungsdateien bleiben erhalten
+SEGMENT_INDEX = os.getenv('segmentIndex', '0') == '1'
 
-def mp3towav(files_dir):
+# Prüfen, ob eine WAV-Datei wirklich 32 kHz mono ist und Samples enthält
+def verifyWav(wav_file_path):
+    info = sf.info(wav_file_path)
+    if info.samplerate != SR or info.channels != 1 or info.frames == 0:
+        raise ValueError(f"{info.samplerate} Hz, {info.channels} Kanäle, {info.frames} Samples statt {SR} Hz mono")
+
+
+# Konvertierung einer mp3-Datei in eine WAV-Datei mit 32 kHz mono
+# Die mp3-Datei wird erst gelöscht, wenn die WAV-Datei das richtige Format hat
+def convertFile(file_path):
+    # neuen Pfad zusammensetzen
+    wav_file_path = os.path.splitext(file_path)[0] + '.wav'
+    try:
+        if PCM_CACHE_ENABLED:
+            # Dekodierte Daten aus dem PCM-Cache schreiben und unter dem Hash der WAV-Datei wiederverwenden
+            sf.write(wav_file_path, loadPCM(file_path, sr=SR), SR, subtype='PCM_16')
+            aliasPCM(file_path, wav_file_path)
+        else:
+            audio = AudioSegment.from_file(file_path)
+            # Nutzen von pydub zum Konvertieren in WAV -> https://stackoverflow.com/questions/5120555/how-can-i-convert-a-wav-from-stereo-to-mono-in-python
+            # set_channels und set_frame_rate liefern ein neues AudioSegment zurück, das Original bleibt unverändert
+            audio = audio.set_channels(1).set_frame_rate(SR)
+            audio.export(wav_file_path, format='wav')
+        verifyWav(wav_file_path)
+    except Exception as e:
+        if os.path.exists(wav_file_path):
+            os.remove(wav_file_path)
+        return file_path, f"{type(e).__name__}: {e}"
+    os.remove(file_path)
+    return file_path, None
+
+
+def mp3towav(files_dir, workers=splitWorkers):
     # alle mp3-Dateien herausfiltern
+    mp3_files = []
     for root, dirs, files in os.walk(files_dir):
         for file in files:
             if file.endswith('.mp3'):
-                file_path = os.path.join(root, file)
-                audio = AudioSegment.from_file(file_path)
-                # neuen Pfad zusammensetzen
-                wav_file_path = os.path.splitext(file_path)[0] + '.wav'
-                # Nutzen von pydub zum Konvertieren in WAV -> https://stackoverflow.com/questions/5120555/how-can-i-convert-a-wav-from-stereo-to-mono-in-python
-                audio.set_channels(1)
-                audio.set_frame_rate(32000)
-                audio.export(wav_file_path, format='wav')
-                os.remove(file_path)
-                print(f"Converted {file} to {wav_file_path}")
-
-
-def generateSplitFiles(files_dir, birdName):
-    df = pd.read_csv(f'{files_dir}/data.csv')
+                mp3_files.append(os.path.join(root, file))
+
+    start = time.perf_counter()
+    # Konvertierung parallel in einem Prozesspool
+    if workers > 1 and len(mp3_files) > 1:
+        with multiprocessing.Pool(min(workers, len(mp3_files))) as pool:
+            results = list(pool.imap_unordered(convertFile, mp3_files))
+    else:
+        results = [convertFile(file_path) for file_path in mp3_files]
+
+    failed = 0
+    for file_path, error in results:
+        if error is None:
+            print(f"Converted {os.path.basename(file_path)} to {os.path.splitext(file_path)[0] + '.wav'}")
+        else:
+            failed += 1
+            print(f"Error converting {file_path}: {error}")
+    print(f"{len(results) - failed} Dateien in {time.perf_counter() - start:.1f}s in 32 kHz mono konvertiert, {failed} Fehler")
+
+
+# Ausschnitt schreiben und im PCM-Cache ablegen -> läuft im Hintergrund-Thread
+def writeSegment(output_file, y, sr):
+    sf.write(output_file, y, sr)
+    storePCM(output_file, y, sr)
+    print(f"Created split file: {output_file}")
+
+
+# Warten bis alle Ausschnitte einer Ursprungsdatei geschrieben sind, danach wird die Ursprungsdatei gelöscht
+# complete=False, wenn das Dekodieren abgebrochen ist -> dann fehlen Ausschnitte
+# Rückgabe: Anzahl geschriebener und fehlgeschlagener Ausschnitte
+def finishFile(input_file, futures, complete=True):
+    written = 0
+    for future in futures:
+        try:
+            future.result()
+            written += 1
+        except Exception as e:
+            print(f"Error processing {input_file}: {e}")
+    # Ursprungsdatei nur löschen, wenn alle Splits geschrieben wurden -> sonst bleibt die Aufnahme für einen erneuten Lauf erhalten
+    if complete and written == len(futures):
+        if os.path.exists(input_file):
+            os.remove(input_file)
+    else:
+        print(f"{input_file} wird nicht gelöscht: {written} von {len(futures) if complete else 'unbekannt vielen'} Ausschnitten geschrieben")
+    return written, len(futures) - written
+
+
+# Splitten mehrerer Ursprungsdateien in einem Worker
+# Jede Datei wird genau einmal dekodiert, alle Ausschnitte sind Slices des Arrays im Speicher
+# Ein Hintergrund-Thread schreibt die Ausschnitte, während schon die nächste Datei dekodiert wird
+def splitFiles(groups):
+    written = 0
+    errors = 0
+    previous = None
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        for input_file, segment_list in groups:
+            futures = []
+            complete = True
+            try:
+                # Sehr lange Aufnahmen werden nicht komplett geladen, sondern pro Ausschnitt gelesen
+                total = audioDuration(input_file)
+                y = loadPCM(input_file, sr=SR) if total is None or total <= PCM_CACHE_MAX_SECONDS else None
+                for output_file, start, end in segment_list:
+                    if y is not None:
+                        segment = sliceSeconds(y, SR, start, end - start)
+                    else:
+                        segment = loadPCM(input_file, sr=SR, offset=start, duration=end - start)
+                    futures.append(writer.submit(writeSegment, output_file, segment, SR))
+            except Exception as e:
+                print(f"Error processing {input_file}: {e}")
+                errors += 1
+                complete = False
+            # Schreiben der vorherigen Datei abschließen -> höchstens zwei Dateien gleichzeitig im Speicher
+            if previous is not None:
+                ok, failed = finishFile(*previous)
+                written += ok
+                errors += failed
+            previous = (input_file, futures, complete)
+        if previous is not None:
+            ok, failed = finishFile(*previous)
+            written += ok
+            errors += failed
+    return written, errors
+
+
+def generateSplitFiles(files_dir, birdName, species=speciesName, workers=splitWorkers, index=SEGMENT_INDEX):
+    # Detections der Vogelart direkt aus der Datenbank lesen -> sortiert nach SoundType, Datei und Startzeit
+    conn = openStore(os.path.join(files_dir, 'detections.sqlite'))
     # Erstelle eine Menge aller erlaubten Dateinamen mit .wav
-    allowed_files = set(df['FileName'].astype(str) + '.wav')
+    allowed_files = {file_name + '.wav' for file_name in storedFiles(conn, species)}
 
     # Durchsuche alle WAV-Dateien in den Unterordnern mit glob -> angepasster Code von: https://stackoverflow.com/questions/3964681/find-all-files-in-a-directory-with-extension-txt-in-python
     for wav_file in glob.glob(os.path.join(files_dir, '*', '*.wav')):
@@ -41,26 +160,39 @@ def generateSplitFiles(files_dir, birdName):
             os.remove(wav_file)
             print(f"Deleted unused file: {wav_file}")
 
-    # Gruppiere nach Datei, damit jede Ursprungsdatei nur einmal gelöscht wird
-    grouped = df.groupby(['SoundType', 'FileName'])
+    # Gruppiere nach Datei -> pro Ursprungsdatei eine Liste aller Ausschnitte (Ausgabedatei, Start, Ende)
+    groups = []
+    grouped = groupby(queryDetections(conn, species=species), key=lambda row: (row['sound_type'], row['file']))
     for (label, file_name), group in grouped:
-        label_folder = label.replace(' ', '')
-
         input_file = f"{files_dir}/{label}/{file_name}.wav"
-        for _, row in group.iterrows():
-            output_file = f"{files_dir}/{label}/{file_name}_{row['Start Time']}_{row['End Time']}.wav"
-            try:
-                start = float(row['Start Time'])
-                duration = float(row['End Time']) - float(row['Start Time'])
-                y, sr = librosa.load(input_file, sr=32000, offset=start, duration=duration)
-                sf.write(output_file, y, sr)
-                print(f"Created split file: {output_file}")
-            except Exception as e:
-                print(f"Error processing {input_file}: {e}")
-        # Ursprungsdatei erst nach allen Splits löschen
-        if os.path.exists(input_file):
-            os.remove(input_file)
+        segment_list = [(f"{files_dir}/{label}/{file_name}_{row['start_time']}_{row['end_time']}.wav", float(row['start_time']), float(row['end_time'])) for row in group]
+        groups.append((input_file, segment_list))
+    conn.close()
+
+    if index:
+        # Keine Ausschnitte schreiben -> Training und Prediction lesen die Ausschnitte als Slices der Ursprungsdateien aus dem PCM-Cache
+        index_path, segments = writeSegmentIndex(files_dir, groups)
+        print(f"{segments} Ausschnitte aus {len(groups)} Dateien in {index_path} eingetragen")
+        return
+
+    start = time.perf_counter()
+    # Aufteilen der Dateien in Pakete -> jedes Paket wird von einem Worker mit eigenem Schreib-Thread bearbeitet
+    chunk_size = max(1, min(8, len(groups) // (workers * 4)))
+    chunks = [groups[i:i + chunk_size] for i in range(0, len(groups), chunk_size)]
+    if workers > 1 and len(chunks) > 1:
+        with multiprocessing.Pool(min(workers, len(chunks))) as pool:
+            results = pool.map(splitFiles, chunks)
+    else:
+        results = [splitFiles(chunk) for chunk in chunks]
+
+    segments = sum(count for count, _ in results)
+    errors = sum(count for _, count in results)
+    elapsed = time.perf_counter() - start
+    rate = segments / elapsed if elapsed > 0 else 0.0
+    print(f"{segments} Ausschnitte aus {len(groups)} Dateien in {elapsed:.1f}s erstellt ({rate:.1f} Ausschnitte/s, {errors} Fehler)")
+
 
-# Beispielaufruf
-mp3towav(files_dir)
-generateSplitFiles(files_dir, birdName)
+# Beispielaufruf -> nur im Hauptprozess, damit die Worker des Prozesspools das Skript nicht erneut ausführen
+if __name__ == '__main__':
+    mp3towav(files_dir)
+    generateSplitFiles(files_dir, birdName)
@@ -0,0 +1,71 @@
+import sys
+import numpy as np
+import soundfile as sf
+import soxr
+
+
+# Dauer einer Audiodatei in Sekunden aus dem Header -> None, wenn soundfile das Format nicht lesen kann
+def audioDuration(file_path):
+    try:
+        return sf.info(file_path).duration
+    except RuntimeError:
+        return None
+
+
+# Audiodatei blockweise lesen (mono, float32, Sampling Rate sr) -> es liegt nie die ganze Aufnahme im Speicher
+# Das Resampling läuft über einen Stream-Resampler, damit an den Blockgrenzen keine Artefakte entstehen
+def streamAudio(file_path, sr, block_seconds=60.0):
+    with sf.SoundFile(file_path) as f:
+        resampler = soxr.ResampleStream(f.samplerate, sr, 1, dtype='float32') if f.samplerate != sr else None
+        for block in f.blocks(blocksize=int(block_seconds * f.samplerate), dtype='float32', always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32)
+            yield resampler.resample_chunk(mono) if resampler else mono
+        if resampler:
+            yield resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+
+
+# Fenster fester Länge aus einem Audiostream schneiden -> liefert (Startzeit in Sekunden, Fenster)
+# Fenster über Blockgrenzen hinweg bleiben vollständig, weil der Rest des vorherigen Blocks mitgeführt wird (Überlappung = window - hop)
+# Am Ende werden Reste ab min_seconds mit Nullen aufgefüllt, kürzere Reste werden verworfen
+def streamWindows(file_path, sr, window_seconds, hop_seconds, block_seconds=60.0, min_seconds=None):
+    window = int(round(window_seconds * sr))
+    hop = int(round(hop_seconds * sr))
+    min_len = window if min_seconds is None else int(round(min_seconds * sr))
+    if hop <= 0 or hop > window:
+        raise ValueError("hop_seconds muss größer als 0 und höchstens window_seconds sein")
+
+    buffer = np.zeros(0, dtype=np.float32)
+    # Position des ersten Samples im Puffer bezogen auf die gesamte Aufnahme
+    offset = 0
+    for block in streamAudio(file_path, sr, block_seconds):
+        buffer = np.concatenate([buffer, block])
+        start = 0
+        while start + window <= len(buffer):
+            yield (offset + start) / sr, buffer[start:start + window]
+            start += hop
+        buffer = buffer[start:]
+        offset += start
+
+    start = 0
+    while len(buffer) - start >= max(min_len, 1):
+        chunk = buffer[start:start + window]
+        if len(chunk) < window:
+            chunk = np.pad(chunk, (0, window - len(chunk)))
+        yield (offset + start) / sr, chunk
+        start += hop
+
+
+# Spitzenwert des Arbeitsspeichers des Prozesses in MB -> resource unter Linux/macOS, psutil unter Windows
+def peakMemoryMB():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 1024 ** 2
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS liefert Bytes, Linux Kilobytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from dotenv import load_dotenv
+from models.BirdNETModels.MelSpecLayerSimple import MelSpecLayerSimple
+from Testing.exportTFLite import MODEL_PATH, TEST_FILES, load_audio, exportTFLite
+from FileEditing.modelLabels import classNames
+from Testing.tfliteRuntime import TFLITE_QUANTIZATIONS, TFLiteModel, tflitePath
+
+# Benchmark Keras gegen TFLite (float16, int8) auf den Testfiles -> Latenz, Durchsatz, Größe und Genauigkeit
+# Fehlende TFLite-Modelle werden vorher exportiert
+# Aufruf aus dem Ordner Testing: python benchmarkTFLite.py [float16,int8]
+load_dotenv()
+# Anzahl Einzelvorhersagen (Batchgröße 1) für die Latenz
+LATENCY_RUNS = int(os.getenv('benchmarkLatencyRuns', '50'))
+# Batchgröße für den Durchsatz
+THROUGHPUT_BATCH_SIZE = int(os.getenv('benchmarkBatchSize', '32'))
+# Klassen in der Reihenfolge des Trainings -> aus den Labels neben dem Modell (von trainEngine beim Export geschrieben)
+CLASS_NAMES = classNames(MODEL_PATH)
+
+
+# Latenz einer Einzelvorhersage und Durchsatz in Batches -> der erste Aufruf jeder Form (Tracing, Allokation) wird nicht gemessen
+def measure(predict_on_batch, X):
+    predict_on_batch(X[:1])
+    latencies = []
+    for i in range(LATENCY_RUNS):
+        start = time.perf_counter()
+        predict_on_batch(X[i % len(X):i % len(X) + 1])
+        latencies.append(time.perf_counter() - start)
+
+    predict_on_batch(X[:THROUGHPUT_BATCH_SIZE])
+    outputs = []
+    start = time.perf_counter()
+    for offset in range(0, len(X), THROUGHPUT_BATCH_SIZE):
+        outputs.append(np.asarray(predict_on_batch(X[offset:offset + THROUGHPUT_BATCH_SIZE])))
+    seconds = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return np.concatenate(outputs), {'p50_ms': float(np.percentile(latencies, 50)), 'p99_ms': float(np.percentile(latencies, 99)),
+                                     'files_per_second': len(X) / seconds}
+
+
+def main(quantizations=TFLITE_QUANTIZATIONS):
+    missing = tuple(quantization for quantization in quantizations if not os.path.exists(tflitePath(MODEL_PATH, quantization)))
+    if missing:
+        exportTFLite(quantizations=missing)
+
+    with open(TEST_FILES, 'r') as f:
+        test_paths = f.read().splitlines()
+    X = np.stack([load_audio(path) for path in test_paths]).astype(np.float32)
+    # Wahre Labels aus dem Ordner der Testfiles
+    y_true = np.array([CLASS_NAMES.index(os.path.basename(os.path.dirname(path))) for path in test_paths])
+
+    rows = []
+    model = tf.keras.models.load_model(MODEL_PATH, custom_objects={"MelSpecLayerSimple": MelSpecLayerSimple})
+    reference, stats = measure(model.predict_on_batch, X)
+    rows.append(('keras', os.path.getsize(MODEL_PATH), reference, stats))
+    for quantization in quantizations:
+        path = tflitePath(MODEL_PATH, quantization)
+        y_pred, stats = measure(TFLiteModel(path).predict_on_batch, X)
+        rows.append((quantization, os.path.getsize(path), y_pred, stats))
+
+    reference_classes = np.argmax(reference, axis=1)
+    baseline_accuracy = float(np.mean(reference_classes == y_true))
+    print(f"{len(X)} Testfiles, Latenz über {LATENCY_RUNS} Einzelvorhersagen, Durchsatz mit Batchgröße {THROUGHPUT_BATCH_SIZE}")
+    print(f"{'Modell':<10}{'Größe':>10}{'p50':>10}{'p99':>10}{'Dateien/s':>12}{'Genauigkeit':>13}{'Verlust':>10}{'gleich wie Keras':>18}{'max. Abw.':>11}")
+    for name, size, y_pred, stats in rows:
+        classes = np.argmax(y_pred, axis=1)
+        accuracy = float(np.mean(classes == y_true))
+        print(f"{name:<10}{size / 1024 ** 2:>8.1f}MB{stats['p50_ms']:>8.1f}ms{stats['p99_ms']:>8.1f}ms{stats['files_per_second']:>12.1f}"
+              f"{accuracy:>13.3f}{baseline_accuracy - accuracy:>10.3f}{np.mean(classes == reference_classes):>18.1%}{np.max(np.abs(y_pred - reference)):>11.4f}")
+
+
+if __name__ == '__main__':
+    main(tuple(sys.argv[1].split(',')) if len(sys.argv) > 1 else TFLITE_QUANTIZATIONS)
@@ -0,0 +1,144 @@
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from FileEditing.streamingAudio import audioDuration, streamWindows
+from FileEditing.modelLabels import classNames
+from Testing.tfliteRuntime import loadModel
+
+# Zeitleiste der Rufarten über ungeschnittene, beliebig lange Aufnahmen
+# Ein 4,5-Sekunden-Fenster wird mit festem Versatz über die Aufnahme geschoben, die Fenster werden in großen Batches vorhergesagt
+# Aufeinanderfolgende Fenster mit derselben Rufart werden zu einem Abschnitt (Start, Ende, Rufart, Konfidenz) zusammengefasst
+# Aufruf aus dem Ordner Testing: python callTypeTimeline.py aufnahme1.wav [aufnahme2.mp3 ...]
+load_dotenv()
+birdName = os.getenv('birdName')
+
+SR = 32000
+DURATION = 4.5
+headName = os.getenv('headName', '')
+headSuffix = f"_{headName}" if headName else ''
+MODEL_PATH = f'../models/trainedModels/birdnet_finetuned_callTypes_{birdName}{headSuffix}.keras'
+# Klassen in der Reihenfolge des Trainings -> aus den Labels neben dem Modell (von trainEngine beim Export geschrieben)
+CLASS_NAMES = classNames(MODEL_PATH)
+# Versatz zwischen zwei Fenstern in Sekunden -> kleiner als 4,5 Sekunden ergibt überlappende Fenster und eine feinere Zeitleiste
+HOP_SECONDS = float(os.getenv('timelineHop', '1.5'))
+# Anzahl Fenster pro Modellaufruf
+BATCH_SIZE = int(os.getenv('timelineBatchSize', '128'))
+# Fenster unter dieser Konfidenz beenden einen Abschnitt und erscheinen nicht in der Zeitleiste
+MIN_CONFIDENCE = float(os.getenv('timelineMinConfidence', '0.5'))
+# Reste am Ende der Aufnahme ab dieser Länge (Sekunden) werden mit Nullen aufgefüllt, kürzere verworfen -> wie die 3-Sekunden-Ausschnitte des Trainings
+MIN_SECONDS = float(os.getenv('timelineMinSeconds', '3.0'))
+# Länge der Blöcke, die gelesen und resampled werden -> begrenzt den Speicherbedarf unabhängig von der Länge der Aufnahme
+BLOCK_SECONDS = float(os.getenv('timelineBlockSeconds', '60'))
+# Ausgabe als CSV -> leer schreibt auf die Konsole
+OUTPUT = os.getenv('timelineOutput', '')
+TIMELINE_HEADER = ['File', 'Start Time', 'End Time', 'Call Type', 'Confidence']
+
+
+# Fenster der Aufnahme in Batches fester Größe -> liefert (Startzeiten, Batch), der letzte Batch wird mit Nullen aufgefüllt
+def windowBatches(file_path, hop_seconds=HOP_SECONDS, batch_size=BATCH_SIZE):
+    start_times = []
+    batch = np.zeros((batch_size, int(SR * DURATION)), dtype=np.float32)
+    for start_time, chunk in streamWindows(file_path, SR, DURATION, hop_seconds, BLOCK_SECONDS, MIN_SECONDS):
+        batch[len(start_times)] = chunk
+        start_times.append(start_time)
+        if len(start_times) == batch_size:
+            yield start_times, batch
+            # Neuer Puffer -> der vorherige Batch wird eventuell noch vorhergesagt, während der nächste gefüllt wird
+            start_times, batch = [], np.zeros_like(batch)
+    if start_times:
+        yield start_times, batch
+
+
+# Konfidenzen aller Fenster einer Aufnahme, Batch für Batch -> liefert (Startzeiten, Konfidenzen)
+# Lesen und Resampling des nächsten Batches laufen in einem Thread parallel zur Vorhersage des aktuellen
+def windowPredictions(model, file_path, hop_seconds=HOP_SECONDS, batch_size=BATCH_SIZE):
+    batches = windowBatches(file_path, hop_seconds, batch_size)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(next, batches, None)
+        while True:
+            item = future.result()
+            if item is None:
+                break
+            future = pool.submit(next, batches, None)
+            start_times, batch = item
+            yield start_times, np.asarray(model.predict_on_batch(batch))[:len(start_times)]
+
+
+# Fenster mit derselben Rufart zu Abschnitten zusammenfassen -> liefert jeden Abschnitt, sobald er abgeschlossen ist
+# Grenzen liegen zwischen den Mittelpunkten zweier aufeinanderfolgender Fenster -> bei überlappenden Fenstern gehört jeder Zeitpunkt genau einem Fenster
+# Ein Abschnitt endet an dieser Grenze, egal ob das nächste Fenster eine andere Rufart hat oder unter min_confidence liegt
+# So überlappen sich die Abschnitte einer Aufnahme nie, nur das erste und letzte Fenster reichen bis zu ihrem Start bzw. Ende
+# Konfidenz eines Abschnitts ist der Mittelwert der höchsten Konfidenz seiner Fenster
+def mergeWindows(windows, min_confidence=MIN_CONFIDENCE):
+    current = None
+    previous_start = None
+    for start_time, scores in windows:
+        call_type = int(np.argmax(scores))
+        confidence = float(scores[call_type])
+        boundary = start_time if previous_start is None else (previous_start + start_time + DURATION) / 2
+        previous_start = start_time
+        if current is not None and (confidence < min_confidence or call_type != current['call_type']):
+            current['end'] = boundary
+            yield current
+            current = None
+        if confidence < min_confidence:
+            continue
+        if current is None:
+            current = {'start': boundary, 'call_type': call_type, 'confidence': 0.0, 'windows': 0}
+        current['end'] = start_time + DURATION
+        current['confidence'] += confidence
+        current['windows'] += 1
+    if current is not None:
+        yield current
+
+
+# Zeitleiste einer Aufnahme -> liefert Zeilen für die CSV, während die Aufnahme noch gelesen wird
+def callTypeTimeline(model, file_path, hop_seconds=HOP_SECONDS, batch_size=BATCH_SIZE, min_confidence=MIN_CONFIDENCE, stats=None):
+    if stats is None:
+        stats = {}
+    stats['windows'] = 0
+
+    def windows():
+        for start_times, scores in windowPredictions(model, file_path, hop_seconds, batch_size):
+            stats['windows'] += len(start_times)
+            yield from zip(start_times, scores)
+
+    # Das letzte Fenster ist mit Nullen aufgefüllt -> kein Abschnitt endet nach der Aufnahme
+    duration = audioDuration(file_path) or float('inf')
+    previous_end = 0.0
+    for segment in mergeWindows(windows(), min_confidence):
+        # mergeWindows liefert keine Überlappungen -> zur Sicherheit beginnt ein Abschnitt nie vor dem Ende des vorherigen
+        start = max(min(segment['start'], duration), previous_end)
+        end = max(min(segment['end'], duration), start)
+        previous_end = end
+        yield [file_path, round(start, 3), round(end, 3), CLASS_NAMES[segment['call_type']],
+               round(segment['confidence'] / segment['windows'], 4)]
+
+
+def main(file_paths):
+    model = loadModel(MODEL_PATH)
+    output = open(OUTPUT, 'w', newline='', encoding='utf-8') if OUTPUT else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(TIMELINE_HEADER)
+        for file_path in file_paths:
+            start = time.perf_counter()
+            stats = {}
+            for row in callTypeTimeline(model, file_path, stats=stats):
+                writer.writerow(row)
+                output.flush()
+            seconds = time.perf_counter() - start
+            duration = audioDuration(file_path) or 0.0
+            print(f"{file_path}: {duration / 60:.1f} min Audio, {stats['windows']} Fenster in {seconds:.1f}s "
+                  f"({duration / max(seconds, 1e-9):.0f}x Echtzeit)", file=sys.stderr)
+    finally:
+        if OUTPUT:
+            output.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+import os
+import random
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from dotenv import load_dotenv
+from models.BirdNETModels.MelSpecLayerSimple import MelSpecLayerSimple
+from FileEditing.pcmCache import loadPCM
+from FileEditing.segmentIndex import SEGMENT_INDEX_FILE, readSegmentIndex
+from Testing.tfliteRuntime import TFLITE_QUANTIZATIONS, tflitePath
+
+# Export des feinjustierten Modells nach TFLite -> float16 (halbe Größe) und int8 (Post-Training-Quantisierung, kalibriert mit Trainingsdaten)
+# Aufruf aus dem Ordner Testing: python exportTFLite.py [float16,int8]
+load_dotenv()
+birdName = os.getenv('birdName')
+
+SR = 32000
+DURATION = 4.5
+SAMPLES = int(SR * DURATION)
+headName = os.getenv('headName', '')
+headSuffix = f"_{headName}" if headName else ''
+MODEL_PATH = f'../models/trainedModels/birdnet_finetuned_callTypes_{birdName}{headSuffix}.keras'
+TEST_FILES = f"../models/test_files/{birdName}{headSuffix}_test_files.txt"
+# Anzahl der Audiodateien für die Kalibrierung der int8-Quantisierung
+CALIBRATION_SAMPLES = int(os.getenv('tfliteCalibrationSamples', '200'))
+
+
+# Audiodatei wie beim Training laden -> auf 4,5 Sekunden aufgefüllt oder gekürzt
+def load_audio(file_path, target_len=SAMPLES):
+    y = loadPCM(file_path, sr=SR)
+    if len(y) < target_len:
+        return np.pad(y, (0, target_len - len(y)))
+    return y[:target_len]
+
+
+# Dateien für die Kalibrierung -> aus den Klassen der Testfiles, aber ohne die Testfiles selbst
+# Liegt ein Segment-Index im Ordner der Vogelart, werden dessen Ausschnitte verwendet
+def calibrationPaths(test_paths, count=CALIBRATION_SAMPLES, seed=42):
+    class_dirs = sorted({os.path.dirname(path) for path in test_paths})
+    excluded = set(test_paths)
+    paths = []
+    for bird_dir in sorted({os.path.dirname(class_dir) for class_dir in class_dirs}):
+        if os.path.exists(os.path.join(bird_dir, SEGMENT_INDEX_FILE)):
+            labels = {os.path.basename(class_dir) for class_dir in class_dirs if os.path.dirname(class_dir) == bird_dir}
+            paths.extend(ref for label, ref in readSegmentIndex(bird_dir) if label in labels)
+        else:
+            for class_dir in class_dirs:
+                if os.path.dirname(class_dir) == bird_dir:
+                    paths.extend(os.path.join(class_dir, file) for file in sorted(os.listdir(class_dir)) if file.endswith('.wav'))
+    paths = [path for path in paths if path not in excluded]
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+
+# TFLite-Konverter für eine Quantisierung -> Ein- und Ausgabe bleiben float32
+# int8: Gewichte und Aktivierungen werden anhand der Kalibrierdaten quantisiert, Operationen ohne int8-Kernel bleiben float32
+def tfliteConverter(model, quantization, calibration=None):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == 'int8':
+        if not calibration:
+            raise ValueError("Für die int8-Quantisierung werden Kalibrierdaten benötigt")
+        converter.representative_dataset = lambda: ([load_audio(path)[np.newaxis].astype(np.float32)] for path in calibration)
+    else:
+        raise ValueError(f"Unbekannte Quantisierung {quantization} -> erlaubt sind {', '.join(TFLITE_QUANTIZATIONS)}")
+    return converter
+
+
+# Konvertieren mit den eingebauten TFLite-Operationen -> nur wenn eine Operation (z.B. aus dem Spektrogramm von MelSpecLayerSimple)
+# nicht unterstützt wird, werden TensorFlow-Operationen zugelassen (benötigt dann die Flex-Delegate zur Laufzeit)
+def convertModel(model, quantization, calibration=None):
+    converter = tfliteConverter(model, quantization, calibration)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+    try:
+        return converter.convert(), False
+    except Exception as e:
+        print(f"Konvertierung nur mit TFLite-Operationen fehlgeschlagen ({type(e).__name__}) -> mit TensorFlow-Operationen (SELECT_TF_OPS)")
+    converter = tfliteConverter(model, quantization, calibration)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    return converter.convert(), True
+
+
+# Alle Quantisierungen exportieren -> Rückgabe der Pfade pro Quantisierung
+def exportTFLite(model_path=MODEL_PATH, test_files=TEST_FILES, quantizations=TFLITE_QUANTIZATIONS):
+    model = tf.keras.models.load_model(model_path, custom_objects={"MelSpecLayerSimple": MelSpecLayerSimple}, compile=False)
+    calibration = None
+    if 'int8' in quantizations:
+        with open(test_files, 'r') as f:
+            calibration = calibrationPaths(f.read().splitlines())
+        print(f"{len(calibration)} Dateien für die Kalibrierung der int8-Quantisierung")
+
+    paths = {}
+    for quantization in quantizations:
+        start = time.perf_counter()
+        content, select_ops = convertModel(model, quantization, calibration)
+        path = tflitePath(model_path, quantization)
+        # Atomar schreiben -> ein laufender Prozess liest nie ein halb geschriebenes Modell
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        paths[quantization] = path
+        print(f"{quantization}: {path} ({len(content) / 1024 ** 2:.1f} MB, {time.perf_counter() - start:.1f}s"
+              f"{', mit TensorFlow-Operationen' if select_ops else ''})")
+    return paths
+
+
+if __name__ == '__main__':
+    exportTFLite(quantizations=tuple(sys.argv[1].split(',')) if len(sys.argv) > 1 else TFLITE_QUANTIZATIONS)
@@ -0,0 +1,272 @@
+import asyncio
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+import soxr
+from dotenv import load_dotenv
+from FileEditing.modelLabels import classNames
+from Testing.serverCommon import SERVER_HOST, SERVER_PORT, SERVER_SOCKET, percentileMs
+from Testing.tfliteRuntime import INFERENCE_RUNTIME, loadModel
+
+# Lokaler Server für die Vorhersage der Rufarten -> das Modell wird einmal geladen und bleibt für alle Anfragen im Speicher
+# Eingehende Clips werden gesammelt und gemeinsam vorhergesagt (dynamisches Micro-Batching):
+# ein Batch startet, sobald serverMaxBatchSize Clips warten oder der älteste Clip serverMaxWaitMs gewartet hat
+# Endpunkte (HTTP/1.1, Keep-Alive):
+#   POST /predict -> Audiodatei (WAV, FLAC, ...) oder mit Content-Type application/octet-stream rohe float32-Samples mit 32 kHz
+#   GET /stats    -> Anfragen, Batches, Latenz (p50/p99) und Durchsatz
+#   GET /health
+# Aufruf aus dem Ordner Testing: python inferenceServer.py -> TCP auf serverHost:serverPort oder Unix-Socket unter serverSocket
+load_dotenv()
+birdName = os.getenv('birdName')
+
+SR = 32000
+DURATION = 4.5
+SAMPLES = int(SR * DURATION)
+headName = os.getenv('headName', '')
+headSuffix = f"_{headName}" if headName else ''
+MODEL_PATH = f'../models/trainedModels/birdnet_finetuned_callTypes_{birdName}{headSuffix}.keras'
+# Klassen in der Reihenfolge des Trainings -> aus den Labels neben dem Modell (von trainEngine beim Export geschrieben)
+CLASS_NAMES = classNames(MODEL_PATH)
+MAX_BATCH_SIZE = int(os.getenv('serverMaxBatchSize', '32'))
+MAX_WAIT_MS = float(os.getenv('serverMaxWaitMs', '5'))
+# Threads zum Dekodieren der Clips -> laufen parallel zur Vorhersage
+DECODE_WORKERS = int(os.getenv('serverDecodeWorkers', str(min(4, os.cpu_count() or 1))))
+# Anzahl der letzten Anfragen für Latenz und Durchsatz in /stats
+STATS_WINDOW = int(os.getenv('serverStatsWindow', '10000'))
+# Größte Anfrage in Bytes
+MAX_BODY_BYTES = 50 * 1024 ** 2
+
+
+# Clip aus dem Body einer Anfrage -> mono, 32 kHz, auf 4,5 Sekunden aufgefüllt oder gekürzt wie load_audio in prediction.py
+def decodeClip(body, content_type=''):
+    if content_type.startswith('application/octet-stream'):
+        y = np.frombuffer(body, dtype=np.float32)
+    else:
+        data, sr = sf.read(io.BytesIO(body), dtype='float32', always_2d=True)
+        y = data.mean(axis=1)
+        if sr != SR:
+            y = soxr.resample(y, sr, SR)
+    if len(y) < SAMPLES:
+        return np.pad(y, (0, SAMPLES - len(y)))
+    return y[:SAMPLES]
+
+
+# Batchgrößen, auf die aufgefüllt wird -> Zweierpotenzen bis MAX_BATCH_SIZE, damit nur wenige Formen kompiliert bzw. alloziert werden
+def batchBuckets(max_batch_size=MAX_BATCH_SIZE):
+    buckets = []
+    size = 1
+    while size < max_batch_size:
+        buckets.append(size)
+        size *= 2
+    return buckets + [max_batch_size]
+
+
+# Zähler des Servers -> Latenz vom Eingang der Anfrage bis zur Antwort, Wartezeit in der Warteschlange, Größe der Batches
+class ServerStats:
+    def __init__(self, window=STATS_WINDOW):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_clips = 0
+        self.latencies = deque(maxlen=window)
+        self.queue_waits = deque(maxlen=window)
+        self.inference = deque(maxlen=window)
+        # Zeitpunkte der letzten Antworten -> Durchsatz über das Fenster
+        self.finished = deque(maxlen=window)
+
+    def recordRequest(self, latency, queue_wait):
+        self.requests += 1
+        self.latencies.append(latency)
+        self.queue_waits.append(queue_wait)
+        self.finished.append(time.perf_counter())
+
+    def recordBatch(self, size, seconds):
+        self.batches += 1
+        self.batched_clips += size
+        self.inference.append(seconds)
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.started
+        span = self.finished[-1] - self.finished[0] if len(self.finished) > 1 else 0.0
+        return {
+            'runtime': INFERENCE_RUNTIME, 'uptime_seconds': uptime, 'requests': self.requests, 'errors': self.errors,
+            'batches': self.batches, 'mean_batch_size': self.batched_clips / self.batches if self.batches else None,
+            'max_batch_size': MAX_BATCH_SIZE, 'max_wait_ms': MAX_WAIT_MS,
+            'latency': {'p50_ms': percentileMs(self.latencies, 50), 'p99_ms': percentileMs(self.latencies, 99),
+                        'mean_ms': float(np.mean(self.latencies)) * 1000 if self.latencies else None},
+            'queue_wait': {'p50_ms': percentileMs(self.queue_waits, 50), 'p99_ms': percentileMs(self.queue_waits, 99)},
+            'batch_inference': {'p50_ms': percentileMs(self.inference, 50), 'p99_ms': percentileMs(self.inference, 99)},
+            'throughput': {'requests_per_second': (len(self.finished) - 1) / span if span > 0 else None,
+                           'requests_per_second_total': self.requests / uptime if uptime > 0 else None},
+        }
+
+
+# Dynamisches Micro-Batching -> Anfragen legen ihren Clip in die Warteschlange und warten auf das Ergebnis ihres Batches
+# Die Vorhersage läuft in einem eigenen Thread, währenddessen nimmt die Event-Loop weitere Anfragen an, die den nächsten Batch bilden
+class MicroBatcher:
+    def __init__(self, model, stats, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.stats = stats
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.buckets = batchBuckets(max_batch_size)
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    # Jede Batchgröße einmal vorhersagen -> die ersten Anfragen warten nicht auf das Kompilieren
+    def warmUp(self):
+        for size in self.buckets:
+            self.model.predict_on_batch(np.zeros((size, SAMPLES), dtype=np.float32))
+
+    async def predict(self, clip):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((clip, future, time.perf_counter()))
+        return await future
+
+    # Nächster Batch -> wartet auf den ersten Clip, danach höchstens max_wait auf weitere
+    async def collect(self):
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(items) < self.max_batch_size:
+            # Bereits wartende Clips ohne Verzögerung übernehmen
+            if not self.queue.empty():
+                items.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self.collect()
+            count = len(items)
+            size = next(bucket for bucket in self.buckets if bucket >= count)
+            batch = np.zeros((size, SAMPLES), dtype=np.float32)
+            for row, (clip, _, _) in enumerate(items):
+                batch[row] = clip
+            dequeued = time.perf_counter()
+            try:
+                scores = await loop.run_in_executor(self.executor, lambda: np.asarray(self.model.predict_on_batch(batch)))
+            except Exception as e:
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats.recordBatch(count, time.perf_counter() - dequeued)
+            for row, (_, future, queued) in enumerate(items):
+                # Abgebrochene Anfragen (Verbindung geschlossen) werden übersprungen
+                if not future.done():
+                    future.set_result((scores[row], dequeued - queued, count))
+
+
+# Antwort als JSON mit Keep-Alive
+async def writeResponse(writer, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error'}[status]
+    writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+
+
+# Eine Verbindung -> mehrere Anfragen nacheinander (Keep-Alive), bis der Client die Verbindung schließt
+async def handleConnection(reader, writer, batcher, stats, decode_pool):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            received = time.perf_counter()
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', '0'))
+            if length > MAX_BODY_BYTES:
+                await writeResponse(writer, 413, {'error': f"Anfrage größer als {MAX_BODY_BYTES} Bytes"})
+                break
+            body = await reader.readexactly(length) if length else b''
+
+            if method == 'GET' and path == '/health':
+                await writeResponse(writer, 200, {'status': 'ok'})
+            elif method == 'GET' and path == '/stats':
+                await writeResponse(writer, 200, stats.snapshot())
+            elif method == 'POST' and path == '/predict':
+                try:
+                    clip = await loop.run_in_executor(decode_pool, decodeClip, body, headers.get('content-type', ''))
+                except Exception as e:
+                    stats.errors += 1
+                    await writeResponse(writer, 400, {'error': f"Audio konnte nicht gelesen werden: {e}"})
+                    continue
+                try:
+                    scores, queue_wait, batch_size = await batcher.predict(clip)
+                except Exception as e:
+                    stats.errors += 1
+                    await writeResponse(writer, 500, {'error': str(e)})
+                    continue
+                latency = time.perf_counter() - received
+                stats.recordRequest(latency, queue_wait)
+                call_type = int(np.argmax(scores))
+                await writeResponse(writer, 200, {
+                    'call_type': CLASS_NAMES[call_type], 'confidence': float(scores[call_type]),
+                    'scores': {name: float(score) for name, score in zip(CLASS_NAMES, scores)},
+                    'batch_size': batch_size, 'latency_ms': latency * 1000})
+            else:
+                await writeResponse(writer, 404, {'error': f"Unbekannter Endpunkt {method} {path}"})
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(model_path=MODEL_PATH, host=SERVER_HOST, port=SERVER_PORT, socket_path=SERVER_SOCKET):
+    start = time.perf_counter()
+    stats = ServerStats()
+    batcher = MicroBatcher(loadModel(model_path), stats)
+    batcher.warmUp()
+    print(f"Modell ({INFERENCE_RUNTIME}) in {time.perf_counter() - start:.1f}s geladen, Batchgrößen {batcher.buckets}, max. Wartezeit {MAX_WAIT_MS} ms")
+
+    decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS)
+    batch_task = asyncio.create_task(batcher.run())
+
+    async def handler(reader, writer):
+        await handleConnection(reader, writer, batcher, stats, decode_pool)
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        print(f"Server läuft auf Unix-Socket {socket_path}")
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        print(f"Server läuft auf http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        decode_pool.shutdown(wait=False)
+        batcher.executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,117 @@
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+import soundfile as sf
+from dotenv import load_dotenv
+from FileEditing.segmentIndex import parseSegmentRef
+from Testing.serverCommon import SERVER_HOST, SERVER_PORT, SERVER_SOCKET, percentileMs
+
+# Lastgenerator für inferenceServer.py -> mehrere Clients senden gleichzeitig Clips an den laufenden Server
+# Jeder Client hält eine Verbindung offen und sendet die nächste Anfrage, sobald die Antwort da ist (geschlossene Last)
+# Mit loadRate (Anfragen pro Sekunde) kommen die Anfragen stattdessen in zufälligen Abständen wie von Rekordern (offene Last)
+# Aufruf aus dem Ordner Testing: python loadGenerator.py [Anzahl Anfragen] [Anzahl Clients]
+# Die Clips sind die Testfiles des Modells, alternativ eine Liste von Dateien in loadFiles (Textdatei, ein Pfad pro Zeile)
+load_dotenv()
+birdName = os.getenv('birdName')
+headName = os.getenv('headName', '')
+headSuffix = f"_{headName}" if headName else ''
+FILES = os.getenv('loadFiles', f"../models/test_files/{birdName}{headSuffix}_test_files.txt")
+LOAD_RATE = float(os.getenv('loadRate', '0'))
+
+
+# Kennzahl mit einer Nachkommastelle -> None (noch keine Messwerte, z.B. alle Anfragen fehlgeschlagen) als n/a
+def formatValue(value, unit=''):
+    return f"{value:.1f}{unit}" if value is not None else 'n/a'
+
+
+# Inhalt einer Audiodatei für den Body -> Ausschnitte "Pfad#Start_Ende" werden ausgeschnitten und als WAV gesendet
+def clipBytes(path):
+    file_path, start, end = parseSegmentRef(path)
+    if start is None:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    with sf.SoundFile(file_path) as f:
+        f.seek(int(start * f.samplerate))
+        data = f.read(int((end - start) * f.samplerate), dtype='float32')
+        sr = f.samplerate
+    buffer = io.BytesIO()
+    sf.write(buffer, data, sr, format='WAV')
+    return buffer.getvalue()
+
+
+async def openConnection(host=SERVER_HOST, port=SERVER_PORT, socket_path=SERVER_SOCKET):
+    if socket_path:
+        return await asyncio.open_unix_connection(socket_path)
+    return await asyncio.open_connection(host, port)
+
+
+# Eine Anfrage über eine offene Verbindung -> Rückgabe von Status und JSON der Antwort
+async def request(reader, writer, method, path, body=b'', content_type='audio/wav'):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+# Ein Client -> nimmt Clips aus der gemeinsamen Warteschlange, bis keine mehr übrig sind
+async def client(clips, pending, latencies, errors, start):
+    reader, writer = await openConnection()
+    try:
+        while pending:
+            item = pending.pop()
+            if LOAD_RATE > 0:
+                # Geplanter Zeitpunkt der Anfrage -> die Latenz zählt ab diesem Zeitpunkt, auch wenn der Client noch beschäftigt war
+                planned = start + item['at']
+                await asyncio.sleep(max(0.0, planned - time.perf_counter()))
+            else:
+                planned = time.perf_counter()
+            status, _ = await request(reader, writer, 'POST', '/predict', clips[item['clip']])
+            if status == 200:
+                latencies.append(time.perf_counter() - planned)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(count, clients):
+    with open(FILES, 'r') as f:
+        paths = [path for path in f.read().splitlines() if path]
+    clips = [clipBytes(path) for path in paths]
+
+    rng = random.Random(42)
+    # Ankunftszeiten einer Poisson-Last bei loadRate, sonst so schnell wie möglich
+    arrivals = np.cumsum(np.random.default_rng(42).exponential(1 / LOAD_RATE, count)) if LOAD_RATE > 0 else np.zeros(count)
+    pending = [{'clip': rng.randrange(len(clips)), 'at': float(at)} for at in arrivals][::-1]
+    latencies, errors = [], []
+    print(f"{count} Anfragen mit {clients} Clients, {len(clips)} verschiedene Clips"
+          f"{f', {LOAD_RATE} Anfragen/s' if LOAD_RATE > 0 else ''}")
+    start = time.perf_counter()
+    await asyncio.gather(*(client(clips, pending, latencies, errors, start) for _ in range(clients)))
+    seconds = time.perf_counter() - start
+
+    reader, writer = await openConnection()
+    _, stats = await request(reader, writer, 'GET', '/stats')
+    writer.close()
+    print(f"Client: {len(latencies)} erfolgreich, {len(errors)} Fehler in {seconds:.1f}s -> {len(latencies) / seconds:.1f} Anfragen/s, "
+          f"Latenz p50 {formatValue(percentileMs(latencies, 50), ' ms')}, p99 {formatValue(percentileMs(latencies, 99), ' ms')}")
+    print(f"Server: mittlere Batchgröße {formatValue(stats['mean_batch_size'])}, Latenz p50 {formatValue(stats['latency']['p50_ms'], ' ms')}, "
+          f"p99 {formatValue(stats['latency']['p99_ms'], ' ms')}, Warteschlange p99 {formatValue(stats['queue_wait']['p99_ms'], ' ms')}")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 500, int(sys.argv[2]) if len(sys.argv) > 2 else 16))
@@ -1,8 +1,10 @@
-import tensorflow as tf
 import numpy as np
-import librosa
 import os
-from models.BirdNETModels.MelSpecLayerSimple import MelSpecLayerSimple
+from FileEditing.pcmCache import loadPCM
+from Testing.streamingEvaluation import EVALUATION_MODE, streamPredictions
+from Testing.predictionCache import cachedPredictions
+from FileEditing.modelLabels import classNames
+from Testing.tfliteRuntime import loadModel, modelFile
 from dotenv import load_dotenv
 import matplotlib.pyplot as plt
 from sklearn.metrics import classification_report, confusion_matrix, ConfusionMatrixDisplay, roc_curve, auc, cohen_kappa_score, average_precision_score, precision_recall_curve
@@ -14,8 +16,14 @@ birdName = os.getenv('birdName')
 SR = 32000
 DURATION = 4.5
 SAMPLES = int(SR * DURATION)
-MODEL_PATH = f'../models/trainedModels/birdnet_finetuned_callTypes_{birdName}.keras'
-CLASS_NAMES = ['alarmcall', 'beggingcall', 'call', 'song']
+# Name des Kopfes, wenn mehrere Köpfe gemeinsam trainiert wurden (Training/trainEngine.py) -> leer bei einem einzelnen Modell
+headName = os.getenv('headName', '')
+headSuffix = f"_{headName}" if headName else ''
+MODEL_PATH = f'../models/trainedModels/birdnet_finetuned_callTypes_{birdName}{headSuffix}.keras'
+# Bei inferenceRuntime=tflite das exportierte TFLite-Modell (exportTFLite.py) in der Quantisierung aus tfliteQuantization
+MODEL_FILE = modelFile(MODEL_PATH)
+# Klassen in der Reihenfolge des Trainings -> aus den Labels neben dem Modell (von trainEngine beim Export geschrieben)
+CLASS_NAMES = classNames(MODEL_PATH)
 
 # Funktion zum Erstellen der random-Baseline
 def random_baseline(y_true):
@@ -85,13 +93,13 @@ def plot_precision_recall_curve():
 
 
 # Laden der Pfade der Testfiles
-with open(f'../models/test_files/{birdName}_test_files.txt', "r") as f:
+with open(f'../models/test_files/{birdName}{headSuffix}_test_files.txt', "r") as f:
     val_paths = [line.strip() for line in f.readlines()]
 
 # Funktion zum Laden und Vorverarbeiten der Audiodateien
 def load_audio(file_path, target_len=SAMPLES):
-    # Audiodatei laden
-    y, _ = librosa.load(file_path, sr=SR)
+    # Audiodatei laden -> über den PCM-Cache, dekodiert und resampled wird nur beim ersten Zugriff
+    y = loadPCM(file_path, sr=SR)
     # Audiodatei von 3 Sekunden auf 4,5 Sekunden verlängern oder kürzen bei Bedarf
     if len(y) < target_len:
         # Wenn die Audiodatei kürzer ist, wird sie mit Nullen aufgefüllt -> Padding
@@ -101,21 +109,24 @@ def load_audio(file_path, target_len=SAMPLES):
         y = y[:target_len]
     return y
 
-# Numpy Array mit allen Audiodateien erstellen -> passt diese über die load_audio Funktion an
-X = np.array([load_audio(path) for path in val_paths])
 # Wahre Labels extrahieren
 y_true = [CLASS_NAMES.index(os.path.basename(os.path.dirname(p))) for p in val_paths]
 # Wahre Labels in Numpy Array umwandeln
 y_true = np.array(y_true)
 
-# Modell laden
-model = tf.keras.models.load_model(
-    MODEL_PATH,
-    custom_objects={"MelSpecLayerSimple": MelSpecLayerSimple}
-)
-
-# Vorhersage des Modells
-y_pred = model.predict(X)
+# Vorhersage des Modells -> Modell wird nur geladen, wenn die Vorhersagen nicht im Cache liegen
+def predict_test_files():
+    # Modell in der Laufzeit aus inferenceRuntime laden -> TensorFlow wird nur für das Keras-Modell importiert
+    model = loadModel(MODEL_PATH)
+    if EVALUATION_MODE == 'streaming':
+        # Testfiles werden parallel dekodiert und batchweise vorhergesagt -> Speicherbedarf unabhängig von der Anzahl der Testfiles
+        return streamPredictions(model, val_paths, load_audio)
+    # Numpy Array mit allen Audiodateien erstellen -> passt diese über die load_audio Funktion an
+    X = np.array([load_audio(path) for path in val_paths])
+    return model.predict(X)
+
+# Vorhersagen aus dem Cache -> Schlüssel aus Modell, Testfiles und Vorverarbeitung, jede Änderung daran berechnet sie neu
+y_pred = cachedPredictions(MODEL_FILE, val_paths, {'sr': SR, 'samples': SAMPLES}, predict_test_files)
 y_pred_classes = np.argmax(y_pred, axis=1)
 
 # Metriken anzeigen
@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+from FileEditing.pcmCache import fileHash, audioKey
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Cache der Vorhersagen (y_pred) für die Testfiles -> Metriken und Plots laufen ohne erneutes Laden des Modells und ohne Inferenz
+PREDICTION_CACHE = os.getenv('predictionCache', '1') == '1'
+PREDICTION_CACHE_DIR = os.getenv('predictionCacheDir', '../cache/predictions')
+
+
+# Schlüssel aus dem Hash des Modells, dem Inhalt und der Reihenfolge der Testfiles und der Vorverarbeitung
+# Jede Änderung am Modell, an einer Audiodatei, an der Liste der Testfiles oder an den Einstellungen ergibt einen neuen Eintrag
+def predictionKey(model_path, paths, settings):
+    key = hashlib.sha256()
+    key.update(fileHash(model_path).encode('utf-8'))
+    key.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    for path in paths:
+        key.update(f"{path}\n{audioKey(path)}\n".encode('utf-8'))
+    return key.hexdigest()[:32]
+
+
+# Vorhersagen aus dem Cache oder einmalig über predict() berechnen und ablegen
+# predict lädt das Modell selbst -> bei einem Treffer wird es nicht geladen
+def cachedPredictions(model_path, paths, settings, predict):
+    if not PREDICTION_CACHE:
+        return predict()
+    start = time.perf_counter()
+    path = os.path.join(PREDICTION_CACHE_DIR, f"{predictionKey(model_path, paths, settings)}.npy")
+    if os.path.exists(path):
+        y_pred = np.load(path)
+        print(f"Vorhersagen aus dem Cache geladen ({path}) in {time.perf_counter() - start:.2f}s")
+        return y_pred
+    y_pred = np.asarray(predict())
+    # Atomar schreiben -> ein abgebrochener Lauf hinterlässt keinen halben Eintrag
+    os.makedirs(PREDICTION_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, y_pred)
+    os.replace(tmp_path, path)
+    return y_pred
@@ -0,0 +1,17 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+# Gemeinsame Einstellungen von inferenceServer.py und loadGenerator.py -> ohne Modell, Labels oder TensorFlow
+# Der Lastgenerator ist ein reiner Client und soll auch ohne trainiertes Modell auf diesem Rechner laufen
+load_dotenv()
+
+SERVER_HOST = os.getenv('serverHost', '127.0.0.1')
+SERVER_PORT = int(os.getenv('serverPort', '8765'))
+# Pfad eines Unix-Sockets -> wenn gesetzt, wird statt TCP dieser Socket verwendet
+SERVER_SOCKET = os.getenv('serverSocket', '')
+
+
+# Perzentil einer Liste von Zeiten in Sekunden -> Millisekunden
+def percentileMs(values, q):
+    return float(np.percentile(np.array(values) * 1000, q)) if values else None
@@ -0,0 +1,60 @@
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from FileEditing.streamingAudio import peakMemoryMB
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Auswertung der Testfiles: 'memory' lädt alle Dateien vorab in ein Array, 'streaming' dekodiert und sagt batchweise vorher
+EVALUATION_MODE = os.getenv('evaluationMode', 'memory')
+EVALUATION_BATCH_SIZE = int(os.getenv('evaluationBatchSize', '32'))
+# Threads zum Dekodieren -> librosa und numpy geben den GIL beim Dekodieren frei
+EVALUATION_WORKERS = int(os.getenv('evaluationWorkers', str(min(8, os.cpu_count() or 1))))
+# Anzahl Batches, die im Voraus dekodiert werden -> begrenzt den Speicherbedarf unabhängig von der Anzahl der Testfiles
+EVALUATION_PREFETCH = int(os.getenv('evaluationPrefetch', '2'))
+
+
+# Batches der dekodierten Audiodateien in der Reihenfolge der Pfade
+# Die Threads dekodieren parallel, höchstens (prefetch + 1) Batches sind gleichzeitig in Arbeit oder fertig im Speicher
+def decodedBatches(paths, load, batch_size=EVALUATION_BATCH_SIZE, workers=EVALUATION_WORKERS, prefetch=EVALUATION_PREFETCH):
+    remaining = iter(paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = deque(pool.submit(load, path) for path in itertools.islice(remaining, batch_size * (prefetch + 1)))
+        while futures:
+            batch = []
+            while futures and len(batch) < batch_size:
+                batch.append(futures.popleft().result())
+                # Für jede fertige Datei wird die nächste angestoßen
+                path = next(remaining, None)
+                if path is not None:
+                    futures.append(pool.submit(load, path))
+            yield np.stack(batch)
+
+
+# Vorhersagen für alle Pfade, Batch für Batch -> das Dekodieren der nächsten Batches läuft während der Vorhersage weiter
+# Nur das Ergebnis (Anzahl Dateien x Klassen) wächst mit den Testfiles
+def streamPredictions(model, paths, load, batch_size=EVALUATION_BATCH_SIZE, workers=EVALUATION_WORKERS):
+    start = time.perf_counter()
+    predictions = None
+    offset = 0
+    for batch in decodedBatches(paths, load, batch_size, workers):
+        count = len(batch)
+        # Letzten Batch auf die volle Größe auffüllen -> keine erneute Kompilierung für eine andere Form
+        if count < batch_size:
+            batch = np.concatenate([batch, np.zeros((batch_size - count,) + batch.shape[1:], dtype=batch.dtype)])
+        output = np.asarray(model.predict_on_batch(batch))[:count]
+        if predictions is None:
+            predictions = np.empty((len(paths),) + output.shape[1:], dtype=output.dtype)
+        predictions[offset:offset + count] = output
+        offset += count
+
+    seconds = time.perf_counter() - start
+    peak = peakMemoryMB()
+    peak_text = f"{peak:.0f} MB" if peak is not None else "unbekannt"
+    print(f"{offset} Dateien in {seconds:.1f}s vorhergesagt ({offset / max(seconds, 1e-9):.1f} Dateien/s), Spitzenwert Arbeitsspeicher {peak_text}")
+    return predictions
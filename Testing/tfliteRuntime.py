@@ -0,0 +1,81 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Laufzeit der Vorhersage: 'keras' lädt das .keras-Modell mit TensorFlow, 'tflite' das exportierte TFLite-Modell (siehe exportTFLite.py)
+INFERENCE_RUNTIME = os.getenv('inferenceRuntime', 'keras')
+# Quantisierung des TFLite-Modells: 'float16' oder 'int8'
+TFLITE_QUANTIZATION = os.getenv('tfliteQuantization', 'float16')
+TFLITE_QUANTIZATIONS = ('float16', 'int8')
+TFLITE_THREADS = int(os.getenv('tfliteThreads', str(os.cpu_count() or 1)))
+
+
+# Pfad des TFLite-Modells neben dem .keras-Modell -> pro Quantisierung eine Datei
+def tflitePath(model_path, quantization=TFLITE_QUANTIZATION):
+    return f"{os.path.splitext(model_path)[0]}_{quantization}.tflite"
+
+
+# Interpreter ohne TensorFlow, wenn möglich -> ai-edge-litert oder tflite-runtime, sonst der Interpreter aus TensorFlow
+def interpreterClass():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ModuleNotFoundError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ModuleNotFoundError:
+            from tensorflow import lite
+            return lite.Interpreter
+    return Interpreter
+
+
+# TFLite-Modell mit derselben Schnittstelle wie ein Keras-Modell für predict_on_batch -> kann an streamPredictions übergeben werden
+# Ein- und Ausgabe bleiben float32, bei quantisierten Ein- oder Ausgängen wird hier umgerechnet
+class TFLiteModel:
+    def __init__(self, model_path, threads=TFLITE_THREADS):
+        self.interpreter = interpreterClass()(model_path=model_path, num_threads=threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        # Neue Batchgröße -> Tensoren neu anlegen, bei gleicher Form wird der bestehende Speicher wiederverwendet
+        if tuple(self.input['shape']) != batch.shape:
+            self.interpreter.resize_tensor_input(self.input['index'], list(batch.shape))
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+        if self.input['dtype'] != np.float32:
+            scale, zero_point = self.input['quantization']
+            info = np.iinfo(self.input['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(self.input['dtype'])
+        self.interpreter.set_tensor(self.input['index'], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output['index'])
+        if self.output['dtype'] != np.float32:
+            scale, zero_point = self.output['quantization']
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    # Vorhersage in Batches fester Größe -> entspricht model.predict von Keras, auch bei leerer Eingabe
+    def predict(self, X, batch_size=32):
+        if len(X) == 0:
+            return np.zeros((0, self.output['shape'][-1]), dtype=np.float32)
+        return np.concatenate([self.predict_on_batch(X[start:start + batch_size]) for start in range(0, len(X), batch_size)])
+
+
+# Datei, die loadModel für das .keras-Modell in der Laufzeit lädt -> z.B. als Schlüssel für den Cache der Vorhersagen
+def modelFile(model_path, runtime=INFERENCE_RUNTIME):
+    return tflitePath(model_path) if runtime == 'tflite' else model_path
+
+
+# Modell für die Vorhersage in der Laufzeit aus inferenceRuntime -> bei 'tflite' das exportierte TFLite-Modell (exportTFLite.py) ohne TensorFlow
+def loadModel(model_path, runtime=INFERENCE_RUNTIME):
+    if runtime == 'tflite':
+        return TFLiteModel(modelFile(model_path, runtime))
+    import tensorflow as tf
+    from models.BirdNETModels.MelSpecLayerSimple import MelSpecLayerSimple
+    return tf.keras.models.load_model(model_path, custom_objects={"MelSpecLayerSimple": MelSpecLayerSimple})
@@ -0,0 +1,139 @@
+import glob
+import os
+import numpy as np
+import tensorflow as tf
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Augmentierung der Trainingsdaten im tf.data-Graphen -> alle Schritte arbeiten auf ganzen Batches, ohne Python-Code pro Sample
+AUGMENT = os.getenv('augment', '0') == '1'
+# Maximale Verschiebung in Sekunden innerhalb des 4,5-Sekunden-Fensters (frei werdende Samples sind Nullen)
+AUGMENT_SHIFT = float(os.getenv('augmentShift', '0.5'))
+# Zufälliger Equalizer: maximale Verstärkung/Absenkung pro Frequenzband in dB (zufällig zwischen -x und +x) -> 0 schaltet ihn aus
+# (eine Änderung der Lautstärke allein hätte keine Wirkung, MelSpecLayerSimple normalisiert jedes Sample auf Minimum und Maximum)
+AUGMENT_EQ_DB = float(os.getenv('augmentEqDb', '6'))
+# Anzahl der Bänder, logarithmisch verteilt zwischen EQ_MIN_HZ und der halben Samplerate
+AUGMENT_EQ_BANDS = int(os.getenv('augmentEqBands', '4'))
+EQ_MIN_HZ = 100.0
+# Ordner mit Hintergrundgeräuschen (WAV) -> leer bedeutet kein Rauschen
+AUGMENT_NOISE_DIR = os.getenv('augmentNoiseDir', '')
+# Wahrscheinlichkeit für Rauschen pro Sample und Bereich des Signal-Rausch-Abstands in dB
+AUGMENT_NOISE_PROB = float(os.getenv('augmentNoiseProb', '0.5'))
+AUGMENT_SNR_DB = tuple(float(value) for value in os.getenv('augmentSnrDb', '5,20').split(','))
+# Maximale Anzahl an Fenstern im Rauschpool -> begrenzt den Speicherbedarf
+AUGMENT_NOISE_POOL = int(os.getenv('augmentNoisePool', '64'))
+# Alpha der Beta-Verteilung für Mixup -> 0 schaltet Mixup aus
+AUGMENT_MIXUP = float(os.getenv('augmentMixup', '0.2'))
+# Startwert der Zufallszahlen -> jeder Batch erhält daraus und aus seiner Nummer eigene Startwerte (siehe mapBatches in dataPipeline.py)
+AUGMENT_SEED = 42
+
+
+# Rauschpool aus den Hintergrunddateien -> Fenster der Länge samples, höchstens max_windows
+def loadNoisePool(noise_dir, samples, load, max_windows=AUGMENT_NOISE_POOL):
+    if not noise_dir:
+        return None
+    windows = []
+    for path in sorted(glob.glob(os.path.join(noise_dir, '**', '*.wav'), recursive=True)):
+        y = np.asarray(load(path), dtype=np.float32)
+        for start in range(0, max(len(y), 1), samples):
+            chunk = y[start:start + samples]
+            if len(chunk) < samples:
+                chunk = np.pad(chunk, (0, samples - len(chunk)))
+            windows.append(chunk)
+            if len(windows) >= max_windows:
+                return tf.constant(np.stack(windows))
+    if not windows:
+        print(f"Warnung: keine Hintergrunddateien in {noise_dir} gefunden")
+        return None
+    return tf.constant(np.stack(windows))
+
+
+# Alle Zufallszahlen sind zustandslos (tf.random.stateless_*) -> seed ist ein Tensor der Form [2], gleicher seed ergibt dieselbe Augmentierung
+
+# Zufällige Verschiebung pro Sample -> Indizes werden für den ganzen Batch auf einmal berechnet
+def timeShift(x, max_shift, seed):
+    batch, samples = tf.shape(x)[0], tf.shape(x)[1]
+    shift = tf.random.stateless_uniform([batch, 1], seed, -max_shift, max_shift + 1, dtype=tf.int32)
+    indices = tf.range(samples)[tf.newaxis, :] - shift
+    valid = (indices >= 0) & (indices < samples)
+    shifted = tf.gather(x, tf.clip_by_value(indices, 0, samples - 1), batch_dims=1)
+    return tf.where(valid, shifted, tf.zeros_like(shifted))
+
+
+# Zufälliger Equalizer pro Sample -> eine Verstärkung pro Band, dazwischen linear über die logarithmische Frequenz interpoliert
+# Verändert das Verhältnis der Frequenzen zueinander und bleibt deshalb nach der Normalisierung im Mel-Spektrogramm erhalten
+def randomEq(x, sr, max_db, bands, seed):
+    batch, samples = tf.shape(x)[0], x.shape[1] or tf.shape(x)[1]
+    gain_db = tf.random.stateless_uniform([batch, bands], seed, -max_db, max_db)
+    freqs = tf.linspace(0.0, sr / 2, samples // 2 + 1)
+    # Position jeder Frequenz zwischen den Bändern (0 bis bands - 1), unter EQ_MIN_HZ gilt das erste Band
+    position = tf.math.log(tf.maximum(freqs, EQ_MIN_HZ) / EQ_MIN_HZ) / np.log(sr / 2 / EQ_MIN_HZ) * (bands - 1)
+    lower = tf.minimum(tf.cast(tf.floor(position), tf.int32), bands - 2)
+    weight = position - tf.cast(lower, tf.float32)
+    curve = tf.gather(gain_db, lower, axis=1) * (1.0 - weight) + tf.gather(gain_db, lower + 1, axis=1) * weight
+    spectrum = tf.signal.rfft(x) * tf.cast(tf.pow(10.0, curve / 20.0), tf.complex64)
+    return tf.signal.irfft(spectrum, fft_length=[samples])
+
+
+# Rauschen aus dem Pool mit zufälligem Signal-Rausch-Abstand beimischen (mit Wahrscheinlichkeit prob pro Sample)
+def addNoise(x, noise_pool, prob, snr_db, seed):
+    batch = tf.shape(x)[0]
+    seeds = tf.random.experimental.stateless_split(seed, 3)
+    noise = tf.gather(noise_pool, tf.random.stateless_uniform([batch], seeds[0], 0, tf.shape(noise_pool)[0], dtype=tf.int32))
+    signal_rms = tf.sqrt(tf.reduce_mean(tf.square(x), axis=1, keepdims=True) + 1e-12)
+    noise_rms = tf.sqrt(tf.reduce_mean(tf.square(noise), axis=1, keepdims=True) + 1e-12)
+    snr = tf.random.stateless_uniform([batch, 1], seeds[1], snr_db[0], snr_db[1])
+    scale = signal_rms / noise_rms * tf.pow(10.0, -snr / 20.0)
+    apply = tf.cast(tf.random.stateless_uniform([batch, 1], seeds[2]) < prob, x.dtype)
+    return x + apply * scale * noise
+
+
+# Mixup: jedes Sample wird mit einem zufälligen anderen Sample des Batches gemischt
+# Labels werden one-hot gemischt, die Gewichte maskierter Köpfe fließen mit ein -> ein Sample ohne Label eines Kopfes verändert dessen Label nicht
+def mixup(x, labels, weights, num_classes, alpha, seed):
+    batch = tf.shape(x)[0]
+    seeds = tf.random.experimental.stateless_split(seed, 3)
+    # Beta(alpha, alpha) über zwei Gamma-Verteilungen
+    first = tf.random.stateless_gamma([batch], seeds[0], alpha)
+    second = tf.random.stateless_gamma([batch], seeds[1], alpha)
+    lam = first / (first + second + 1e-12)
+    perm = tf.random.experimental.stateless_shuffle(tf.range(batch), seeds[2])
+    x = lam[:, tf.newaxis] * x + (1.0 - lam)[:, tf.newaxis] * tf.gather(x, perm)
+    mixed_labels = {}
+    mixed_weights = {}
+    for name, head_labels in labels.items():
+        y = tf.one_hot(head_labels, num_classes[name])
+        own = lam * weights[name]
+        other = (1.0 - lam) * tf.gather(weights[name], perm)
+        total = own + other
+        mixed_labels[name] = (own[:, tf.newaxis] * y + other[:, tf.newaxis] * tf.gather(y, perm)) / tf.maximum(total, 1e-8)[:, tf.newaxis]
+        mixed_weights[name] = total
+    return x, mixed_labels, mixed_weights
+
+
+# Labels one-hot kodieren -> für Validierungsdaten, wenn beim Training Mixup verwendet wird
+def oneHotLabels(num_classes):
+    def encode(index, x, labels, weights):
+        return x, {name: tf.one_hot(head_labels, num_classes[name]) for name, head_labels in labels.items()}, weights
+    return encode
+
+
+# Augmentierung eines Batches (Nummer des Batches, Audiodaten, Labels pro Kopf, Gewichte pro Kopf) -> wird nach dem Batchen über mapBatches verwendet
+# Die Zufallszahlen hängen nur von AUGMENT_SEED und der Nummer des Batches ab, nicht von einem Zustand in tf.random
+def batchAugmentation(sr, num_classes, noise_pool=None):
+    max_shift = int(AUGMENT_SHIFT * sr)
+
+    def augment(index, x, labels, weights):
+        seeds = tf.random.experimental.stateless_split(tf.stack([tf.constant(AUGMENT_SEED, tf.int64), index]), 4)
+        if max_shift > 0:
+            x = timeShift(x, max_shift, seeds[0])
+        if AUGMENT_EQ_DB > 0 and AUGMENT_EQ_BANDS > 1:
+            x = randomEq(x, sr, AUGMENT_EQ_DB, AUGMENT_EQ_BANDS, seeds[1])
+        if noise_pool is not None and AUGMENT_NOISE_PROB > 0:
+            x = addNoise(x, noise_pool, AUGMENT_NOISE_PROB, AUGMENT_SNR_DB, seeds[2])
+        if AUGMENT_MIXUP > 0:
+            return mixup(x, labels, weights, num_classes, AUGMENT_MIXUP, seeds[3])
+        return x, labels, weights
+    return augment
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+import time
+import h5py
+import keras
+import tensorflow as tf
+from models.BirdNETModels.MelSpecLayerSimple import MelSpecLayerSimple
+from FileEditing.pcmCache import fileHash
+from Training.instrumentation import stage
+
+MODEL_PATH = '../models/BirdNETModels/audio-model.h5'  # Pfad zum geladenen BirdNET BaseModel
+# Cache der konvertierten Modelle -> pro Version ein Ordner, das Original wird nie verändert
+ARTIFACT_DIR = '../cache/models'
+# Version der Konvertierung -> erhöhen, wenn sich der Ablauf ändert, damit alte Artefakte nicht mehr verwendet werden
+CONVERSION_VERSION = 1
+
+
+# Ordner des konvertierten Modells -> Schlüssel aus Hash der .h5-Datei, Keras-Version und Version der Konvertierung
+def artifactDir(model_path=MODEL_PATH):
+    return os.path.join(ARTIFACT_DIR, f"{fileHash(model_path)[:16]}_keras{keras.__version__}_v{CONVERSION_VERSION}")
+
+
+# Einmalige Konvertierung des BaseModels in das native .keras-Format
+# Gepatcht wird eine Kopie der .h5-Datei -> parallele Trainings teilen sich das Original nur lesend
+def convertBaseModel(model_path=MODEL_PATH):
+    target_dir = artifactDir(model_path)
+    target = os.path.join(target_dir, 'audio-model.keras')
+    if os.path.exists(target):
+        return target
+
+    start = time.perf_counter()
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_h5 = os.path.join(target_dir, f"audio-model.{os.getpid()}.h5")
+    shutil.copyfile(model_path, tmp_h5)
+    try:
+        # Probleme beim Laden des BaseModells aufgrund der .h5 Dateiendung -> Modul hp5py verwendet -> Workaround von https://stackoverflow.com/questions/78187204/trying-to-export-teachable-machine-model-but-returning-error
+        with stage('patch_h5'), h5py.File(tmp_h5, mode="r+") as f:
+            model_config_string = f.attrs.get("model_config")
+            if model_config_string.find('"groups": 1,') != -1:
+                model_config_string = model_config_string.replace('"groups": 1,', '')
+            f.attrs.modify('model_config', model_config_string)
+            f.flush()
+            assert f.attrs.get("model_config").find('"groups": 1,') == -1
+
+        with stage('convert_base_model'):
+            model = tf.keras.models.load_model(tmp_h5, custom_objects={"MelSpecLayerSimple": MelSpecLayerSimple}, compile=False)
+            # Atomar schreiben -> ein zweiter Prozess, der gleichzeitig konvertiert, überschreibt nur mit demselben Inhalt
+            tmp_keras = os.path.join(target_dir, f"audio-model.{os.getpid()}.keras")
+            model.save(tmp_keras)
+            os.replace(tmp_keras, target)
+    finally:
+        os.remove(tmp_h5)
+
+    with open(os.path.join(target_dir, 'source.json'), 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.abspath(model_path), 'sha256': fileHash(model_path), 'keras': keras.__version__,
+                   'tensorflow': tf.__version__, 'conversion_version': CONVERSION_VERSION}, f, indent=2)
+    print(f"BaseModel in {time.perf_counter() - start:.1f}s nach {target} konvertiert")
+    return target
+
+
+# BaseModel aus dem Cache laden, alle Schichten sind eingefroren
+def loadBaseModel(model_path=MODEL_PATH):
+    path = convertBaseModel(model_path)
+    start = time.perf_counter()
+    # Modell wird geladen -> MelSpecLayerSimple wird als benutzerdefinierte Schicht hinzugefügt, da sie im BaseModel von BirdNET verwendet wird
+    # safe_mode=False -> das Artefakt wurde lokal aus der .h5-Datei erzeugt, die bisher ebenfalls ohne Prüfung geladen wurde
+    with stage('load_base_model'):
+        model = tf.keras.models.load_model(path, custom_objects={"MelSpecLayerSimple": MelSpecLayerSimple}, compile=False, safe_mode=False)
+    print(f"BaseModel in {time.perf_counter() - start:.1f}s geladen")
+
+    # vorherige Layer des Modells einfrieren, damit sie nicht trainiert werden
+    for layer in model.layers:
+        layer.trainable = False
+    return model
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen (z.B. benchmarkEpochs)
+load_dotenv()
+
+# Benchmark der Performance-Einstellungen des Trainings -> jede Konfiguration läuft in einem eigenen Prozess,
+# da die Thread-Pools von TensorFlow nur vor der ersten Operation festgelegt werden können
+# Aufruf aus dem Ordner Training: python benchmarkTraining.py [trainConfig.json]
+cores = str(os.cpu_count() or 1)
+CONFIGURATIONS = [
+    ('float32', {}),
+    ('xla', {'jitCompile': '1'}),
+    ('bf16', {'mixedPrecision': 'mixed_bfloat16'}),
+    ('xla + bf16', {'jitCompile': '1', 'mixedPrecision': 'mixed_bfloat16'}),
+    ('xla + threads', {'jitCompile': '1', 'interOpThreads': '2', 'intraOpThreads': cores}),
+    ('xla + bf16 + threads', {'jitCompile': '1', 'mixedPrecision': 'mixed_bfloat16', 'interOpThreads': '2', 'intraOpThreads': cores}),
+]
+# Anzahl Epochen pro Konfiguration -> die erste Epoche enthält das Kompilieren und zählt nicht zu den Schritten pro Sekunde
+EPOCHS = int(os.getenv('benchmarkEpochs', '3'))
+
+
+# Ein Lauf im Kindprozess -> Modelle und Testfiles landen im temporären Ordner, die Ergebnisse als JSON
+def runConfiguration(config_path, output_dir, result_path):
+    from Training.trainEngine import trainHeads
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['epochs'] = EPOCHS
+    for head in config['heads']:
+        head['output'] = os.path.join(output_dir, f"{head['name']}.keras")
+        head['test_files'] = os.path.join(output_dir, f"{head['name']}_test_files.txt")
+    result = trainHeads(config)
+    # Schritte pro Sekunde ohne die erste Epoche (Kompilieren, Aufwärmen der Datensätze)
+    timed = result['epoch_seconds'][1:] or result['epoch_seconds']
+    accuracy = {key: values[-1] for key, values in result['history'].items() if key.startswith('val_') and key.endswith('accuracy')}
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({'steps_per_second': result['steps_per_epoch'] * len(timed) / sum(timed), 'accuracy': accuracy}, f)
+
+
+def main(config_path):
+    rows = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, settings in CONFIGURATIONS:
+            print(f"Konfiguration {name}: {settings}")
+            result_path = os.path.join(output_dir, 'result.json')
+            # Feste Anzahl Epochen ohne Checkpoints -> jeder Lauf beginnt neu und misst nur das Training
+            env = dict(os.environ, checkpointEvery='0', earlyStoppingPatience='0', **settings)
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--run', config_path, output_dir, result_path], env=env, check=True)
+            with open(result_path, 'r', encoding='utf-8') as f:
+                rows.append((name, json.load(f)))
+
+    print(f"{'Konfiguration':<24}{'Schritte/s':>12}  Genauigkeit (Validierung)")
+    baseline = rows[0][1]['steps_per_second']
+    for name, result in rows:
+        accuracy = ', '.join(f"{key}={value:.3f}" for key, value in result['accuracy'].items())
+        print(f"{name:<24}{result['steps_per_second']:>12.2f}  {accuracy}  (x{result['steps_per_second'] / baseline:.2f})")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        runConfiguration(*sys.argv[2:5])
+    else:
+        main(sys.argv[1] if len(sys.argv) > 1 else os.getenv('trainConfig', 'trainConfig.json'))
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import random
+import shutil
+import numpy as np
+import tensorflow as tf
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Checkpoints des Trainings -> pro Konfiguration ein Ordner, ein abgebrochenes Training wird beim nächsten Start fortgesetzt
+CHECKPOINT_DIR = os.getenv('checkpointDir', '../models/checkpoints')
+# Checkpoint alle n Epochen -> 0 schaltet Checkpoints aus
+CHECKPOINT_EVERY = int(os.getenv('checkpointEvery', '1'))
+# resume=0 ignoriert vorhandene Checkpoints und beginnt neu
+RESUME = os.getenv('resume', '1') == '1'
+# Abbruch, wenn sich der Loss der Validierungsdaten so viele Epochen nicht verbessert -> 0 schaltet das aus
+EARLY_STOPPING_PATIENCE = int(os.getenv('earlyStoppingPatience', '5'))
+EARLY_STOPPING_MIN_DELTA = float(os.getenv('earlyStoppingMinDelta', '0'))
+
+
+# Ordner eines Trainings -> Schlüssel aus den Einstellungen und den Trainingsdateien, die Anzahl der Epochen gehört nicht dazu
+def checkpointPath(name, settings, train_paths, checkpoint_dir=CHECKPOINT_DIR):
+    key = hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+    for path in train_paths:
+        key.update(f"{path}\n".encode('utf-8'))
+    return os.path.join(checkpoint_dir, f"{name}_{key.hexdigest()[:16]}")
+
+
+# Zustand des letzten Checkpoints (Epoche, Early Stopping, Verlauf) -> None, wenn keiner vorhanden ist
+def readCheckpoint(path):
+    checkpoint_file = os.path.join(path, 'checkpoint.npz')
+    if not RESUME or not os.path.exists(checkpoint_file):
+        return None
+    with np.load(checkpoint_file) as data:
+        return json.loads(str(data['state']))
+
+
+# Zustand der Zufallsgeneratoren (random, numpy) -> beim Fortsetzen wird dort weitergemacht, wo das Training unterbrochen wurde
+def randomState():
+    version, state, gauss = random.getstate()
+    np_state = np.random.get_state()
+    return {'random': [version, list(state), gauss],
+            'numpy': [np_state[0], np_state[1].tolist(), int(np_state[2]), int(np_state[3]), float(np_state[4])]}
+
+
+def restoreRandomState(state):
+    version, values, gauss = state['random']
+    random.setstate((version, tuple(values), gauss))
+    name, keys, pos, has_gauss, cached = state['numpy']
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached))
+
+
+# Early Stopping auf dem Loss der Validierungsdaten, dessen Zustand mit dem Checkpoint gespeichert wird
+# Wie EarlyStopping von Keras mit restore_best_weights, gemerkt werden aber nur die trainierten Variablen, nicht der eingefrorene Backbone
+class ResumableEarlyStopping(tf.keras.callbacks.Callback):
+    def __init__(self, variables, patience=EARLY_STOPPING_PATIENCE, min_delta=EARLY_STOPPING_MIN_DELTA):
+        super().__init__()
+        self.variables = variables
+        self.patience = patience
+        self.min_delta = min_delta
+        self.wait = 0
+        self.best = None
+        self.best_epoch = None
+        self.best_weights = None
+        self.stopped_epoch = None
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get('val_loss')
+        if current is None:
+            return
+        if self.best is None or current < self.best - self.min_delta:
+            self.best = float(current)
+            self.best_epoch = epoch
+            self.wait = 0
+            self.best_weights = [np.array(v.numpy()) for v in self.variables]
+            return
+        self.wait += 1
+        if self.wait >= self.patience:
+            self.stopped_epoch = epoch
+            self.model.stop_training = True
+
+    def on_train_end(self, logs=None):
+        if self.stopped_epoch is not None and self.best_weights is not None:
+            for variable, value in zip(self.variables, self.best_weights):
+                variable.assign(value)
+            print(f"Early Stopping nach Epoche {self.stopped_epoch + 1}, Gewichte der besten Epoche {self.best_epoch + 1} wiederhergestellt (val_loss={self.best:.4f})")
+
+    def getState(self):
+        return {'wait': self.wait, 'best': self.best, 'best_epoch': self.best_epoch}
+
+    def setState(self, state, best_weights=None):
+        self.wait = state['wait']
+        self.best = state['best']
+        self.best_epoch = state['best_epoch']
+        self.best_weights = best_weights
+
+
+# Checkpoint am Ende jeder n-ten Epoche -> trainierbare Variablen (inkl. Zustand des Dropouts), Optimizer, Epoche,
+# Zufallsgeneratoren, Early Stopping und bisheriger Verlauf
+# Der Backbone ist eingefroren und wird nicht mitgespeichert
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    def __init__(self, path, variables, early_stopping=None, every=CHECKPOINT_EVERY, history=None, write=True):
+        super().__init__()
+        self.path = path
+        self.variables = variables
+        self.early_stopping = early_stopping
+        self.every = every
+        self.history = dict(history or {})
+        # Im verteilten Training schreibt nur ein Worker
+        self.write = write
+
+    def on_epoch_end(self, epoch, logs=None):
+        for key, value in (logs or {}).items():
+            self.history.setdefault(key, []).append(float(value))
+        if self.every > 0 and self.write and (epoch + 1) % self.every == 0:
+            self.save(epoch + 1)
+
+    def save(self, epoch):
+        os.makedirs(self.path, exist_ok=True)
+        arrays = {f"model_{i}": np.asarray(v.numpy()) for i, v in enumerate(self.variables)}
+        arrays.update({f"optimizer_{i}": np.asarray(v.numpy()) for i, v in enumerate(self.model.optimizer.variables)})
+        state = {'epoch': epoch, 'history': self.history, 'random': randomState()}
+        if self.early_stopping is not None:
+            state['early_stopping'] = self.early_stopping.getState()
+            if self.early_stopping.best_weights is not None:
+                arrays.update({f"best_{i}": np.asarray(w) for i, w in enumerate(self.early_stopping.best_weights)})
+        # Variablen und Zustand in einer Datei, atomar geschrieben -> ein Abbruch beim Schreiben hinterlässt immer den vorherigen vollständigen Checkpoint
+        tmp_path = os.path.join(self.path, f"checkpoint.{os.getpid()}.npz")
+        np.savez(tmp_path, state=np.array(json.dumps(state)), **arrays)
+        os.replace(tmp_path, os.path.join(self.path, 'checkpoint.npz'))
+
+    # Variablen, Optimizer und Zustand aus dem Checkpoint übernehmen -> Rückgabe ist die Epoche, bei der das Training weitergeht
+    # Passt der Checkpoint nicht zum Modell (andere Anzahl oder Form der Variablen), wird abgebrochen -> die Datensätze sind bereits auf die Epoche ausgerichtet
+    def restore(self, state):
+        with np.load(os.path.join(self.path, 'checkpoint.npz')) as data:
+            model_values = [data[f"model_{i}"] for i in range(len(self.variables)) if f"model_{i}" in data]
+            optimizer_values = [data[key] for key in sorted((key for key in data.files if key.startswith('optimizer_')), key=lambda key: int(key.split('_')[1]))]
+            best_weights = [data[key] for key in sorted((key for key in data.files if key.startswith('best_')), key=lambda key: int(key.split('_')[1]))]
+        optimizer_variables = self.model.optimizer.variables
+        if len(model_values) != len(self.variables) or len(optimizer_values) != len(optimizer_variables) or any(
+                tuple(v.shape) != value.shape for v, value in zip(list(self.variables) + list(optimizer_variables), model_values + optimizer_values)):
+            raise ValueError(f"Checkpoint unter {self.path} passt nicht zum Modell -> Ordner löschen oder mit resume=0 neu beginnen")
+        for variable, value in zip(self.variables, model_values):
+            variable.assign(value)
+        for variable, value in zip(optimizer_variables, optimizer_values):
+            variable.assign(value)
+        restoreRandomState(state['random'])
+        if self.early_stopping is not None and 'early_stopping' in state:
+            self.early_stopping.setState(state['early_stopping'], best_weights or None)
+        self.history = state['history']
+        print(f"Training wird ab Epoche {state['epoch'] + 1} aus {self.path} fortgesetzt")
+        return state['epoch']
+
+    # Nach einem vollständigen Training (alle Epochen oder Early Stopping) wird der Checkpoint nicht mehr benötigt
+    def remove(self):
+        if self.write:
+            shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from FileEditing.streamingAudio import peakMemoryMB
+
+# Verzeichnis für den Cache von tf.data -> dekodierte und zugeschnittene Audiodaten nach der ersten Epoche
+TFDATA_CACHE_DIR = '../cache/tfdata'
+
+
+# Zielwerte eines Datensatzes als Tupel -> einfache Labels oder bereits ein Tupel wie (Labels pro Kopf, Gewichte pro Kopf)
+def datasetTargets(labels):
+    return labels if isinstance(labels, tuple) else (np.array(labels, dtype=np.int32),)
+
+
+# Pfad des Caches eines Datensatzes -> Schlüssel sind Dateipfade, Zielwerte und Länge, damit geänderte Daten nicht aus einem alten Cache gelesen werden
+def cacheFile(file_paths, targets, samples, cache_dir=TFDATA_CACHE_DIR):
+    key = hashlib.sha1()
+    for path in file_paths:
+        key.update(f"{path}\n".encode('utf-8'))
+    for target in tf.nest.flatten(targets):
+        key.update(np.ascontiguousarray(target).tobytes())
+    key.update(str(samples).encode('utf-8'))
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, key.hexdigest())
+
+
+# Endlose, gemischte Trainingsdaten aus Tensoren (Audiodaten oder Pfade, Labels, Gewichte)
+# Jede Epoche ist eine eigene Permutation aus (seed, Epoche) -> die Reihenfolge hängt nicht davon ab, wie oft der Datensatz schon gelesen wurde
+# (shuffle von tf.data teilt den Zufallszustand zwischen allen Iteratoren, z.B. mit dem ersten Batch aus reportDataset)
+# skip überspringt beim Fortsetzen eines Trainings die bereits gesehenen Beispiele -> es werden nur Indizes gelesen
+def shuffledDataset(tensors, count, seed=42, skip=0):
+    tensors = tf.nest.map_structure(tf.convert_to_tensor, tuple(tensors))
+
+    def permutation(epoch):
+        order = tf.random.experimental.stateless_shuffle(tf.range(count, dtype=tf.int64), seed=tf.stack([tf.constant(seed, tf.int64), epoch]))
+        return tf.data.Dataset.from_tensor_slices(order)
+
+    indices = tf.data.Dataset.counter().flat_map(permutation).skip(skip)
+    return indices.map(lambda index: tf.nest.map_structure(lambda tensor: tf.gather(tensor, index), tensors), num_parallel_calls=tf.data.AUTOTUNE)
+
+
+# batch_map auf jeden Batch anwenden -> erhält als ersten Wert die Nummer des Batches (über alle Epochen gezählt, ab skip_batches)
+# Die Augmentierung leitet ihre Zufallszahlen zustandslos aus dieser Nummer ab -> ein fortgesetztes Training sieht dieselben Varianten wie ein ununterbrochenes
+def mapBatches(dataset, batch_map, skip_batches=0):
+    numbered = tf.data.Dataset.zip((tf.data.Dataset.counter(start=skip_batches), dataset))
+    return numbered.map(lambda index, batch: batch_map(index, *batch), num_parallel_calls=tf.data.AUTOTUNE)
+
+
+# Datensatz, der von den Dateipfaden ausgeht -> Dekodieren, Auffüllen und Kürzen laufen parallel in map, prefetch überlappt das Laden mit dem Training
+# Der Speicherbedarf hängt nur von Batchgröße und Prefetch ab, nicht von der Anzahl der Dateien
+# Mit cache=True werden die Audiodaten nach der ersten Epoche aus einer Datei gelesen statt erneut dekodiert
+# batch_map wird auf jeden Batch angewendet (z.B. Augmentierung), nach dem Cache, damit jede Epoche neue Varianten erhält
+# skip_batches überspringt beim Fortsetzen eines Trainings die bereits gesehenen Batches -> ohne Cache werden dafür nur Indizes gelesen, nichts dekodiert
+# Mit Cache mischt ein Puffer nach dem Cache, die Reihenfolge nach dem Fortsetzen ist dann nicht genau dieselbe
+def streamingDataset(file_paths, labels, batch_size, is_training, load, samples, cache=False, batch_map=None, skip_batches=0):
+    targets = datasetTargets(labels)
+
+    def decode(path):
+        return np.ascontiguousarray(load(path.decode('utf-8')), dtype=np.float32)
+
+    def loadExample(path, *example_targets):
+        y = tf.numpy_function(decode, [path], tf.float32)
+        y.set_shape([samples])
+        return (y,) + example_targets
+
+    if is_training and not cache:
+        # Ohne Cache werden nur die Pfade gemischt -> vollständiges Mischen ohne Audiodaten im Puffer
+        dataset = shuffledDataset((tf.constant(list(file_paths)),) + targets, len(file_paths), skip=skip_batches * batch_size)
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((list(file_paths),) + targets)
+    dataset = dataset.map(loadExample, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not is_training)
+    if cache:
+        dataset = dataset.cache(cacheFile(file_paths, targets, samples))
+    if is_training and cache:
+        # Mischen nach dem Cache, sonst wäre die Reihenfolge ab der zweiten Epoche fest
+        dataset = dataset.shuffle(1000, seed=42).repeat().skip(skip_batches * batch_size)
+    dataset = dataset.batch(batch_size)
+    if batch_map is not None:
+        dataset = mapBatches(dataset, batch_map, skip_batches)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+# Zeit bis zum ersten Batch (ab start) und Spitzenwert des Arbeitsspeichers ausgeben
+def reportDataset(mode, dataset, start):
+    next(iter(dataset))
+    peak = peakMemoryMB()
+    peak_text = f"{peak:.0f} MB" if peak is not None else "unbekannt"
+    first_batch = time.perf_counter() - start
+    print(f"Datensatz ({mode}): erster Batch nach {first_batch:.1f}s, Spitzenwert Arbeitsspeicher {peak_text}")
+    return {'mode': mode, 'ready_seconds': first_batch, 'peak_memory_mb': peak}
@@ -0,0 +1,140 @@
+import contextlib
+import json
+import os
+import tensorflow as tf
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Verteiltes Training über mehrere Prozesse -> aktiv, sobald TF_CONFIG gesetzt ist (siehe launchWorkers.py)
+# Standard: die globale Batchgröße bleibt batchSize und wird auf die Worker aufgeteilt -> gleiche Schritte wie im Einzelprozess
+# distributedBatchScaling=1: jeder Worker rechnet batchSize Samples, die globale Batchgröße wächst mit der Anzahl Worker
+DISTRIBUTED_BATCH_SCALING = os.getenv('distributedBatchScaling', '0') == '1'
+
+
+# Strategie für das verteilte Training -> None ohne TF_CONFIG
+# Muss vor der ersten Operation von TensorFlow erstellt werden
+def distributionStrategy():
+    if not os.getenv('TF_CONFIG'):
+        return None
+    return tf.distribute.MultiWorkerMirroredStrategy()
+
+
+# Scope für Variablen, die verteilt trainiert werden
+def strategyScope(strategy):
+    return strategy.scope() if strategy is not None else contextlib.nullcontext()
+
+
+# Worker 0 schreibt Testfiles, Modelle und Ergebnisse -> ohne TF_CONFIG ist der einzige Prozess der Chief
+def isChief():
+    config = json.loads(os.getenv('TF_CONFIG') or '{}')
+    task = config.get('task', {})
+    return task.get('type', 'worker') == 'chief' or (task.get('type', 'worker') == 'worker' and task.get('index', 0) == 0)
+
+
+# Globale Batchgröße für die Anzahl der Replikate
+def globalBatchSize(batch_size, strategy):
+    replicas = strategy.num_replicas_in_sync if strategy is not None else 1
+    return batch_size * replicas if DISTRIBUTED_BATCH_SCALING else batch_size
+
+
+# Datensatz nach Samples auf die Worker verteilen (AutoShardPolicy.DATA) -> alle Worker lesen dieselben Dateien, jeder verarbeitet seinen Anteil
+def shardDataset(dataset, strategy):
+    if strategy is None:
+        return dataset
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options)
+
+
+# Trainingsschleife für das verteilte Training -> model.fit von Keras 3 unterstützt die MultiWorkerMirroredStrategy
+# nicht mit Datensätzen aus (Audio, Labels, Gewichte) pro Kopf, daher eigene Schritte mit strategy.run
+# losses: pro Kopf eine Loss-Funktion pro Sample (z.B. tf.keras.losses.sparse_categorical_crossentropy)
+# Die Logs entsprechen denen von fit (loss, {Kopf}_loss, {Kopf}_accuracy, val_... bzw. accuracy bei nur einem Kopf), Rückgabe ist der History-Callback
+def distributedFit(strategy, model, losses, train_ds, val_ds, epochs, steps_per_epoch, validation_steps, callbacks=(), initial_epoch=0):
+    def stepOutputs(x, labels, weights, training):
+        predictions = model(x, training=training)
+        outputs = {}
+        total = 0.0
+        for name, loss_fn in losses.items():
+            prediction = tf.cast(predictions[name], tf.float32)
+            # Mittelwert über den globalen Batch -> die Gradienten werden über alle Replikate summiert
+            head_loss = tf.nn.compute_average_loss(loss_fn(labels[name], prediction), sample_weight=weights[name])
+            target = labels[name] if labels[name].shape.rank == 1 else tf.argmax(labels[name], axis=-1)
+            correct = tf.cast(tf.equal(tf.argmax(prediction, axis=-1), tf.cast(target, tf.int64)), tf.float32)
+            outputs[f'{name}_loss'] = head_loss
+            outputs[f'{name}_correct'] = tf.reduce_sum(correct * weights[name])
+            outputs[f'{name}_weight'] = tf.reduce_sum(weights[name])
+            total += head_loss
+        if model.losses:
+            total += tf.nn.scale_regularization_loss(tf.add_n(model.losses))
+        outputs['loss'] = total
+        return outputs
+
+    def trainStep(x, labels, weights):
+        with tf.GradientTape() as tape:
+            outputs = stepOutputs(x, labels, weights, training=True)
+        gradients = tape.gradient(outputs['loss'], model.trainable_variables)
+        model.optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+        return outputs
+
+    def testStep(x, labels, weights):
+        return stepOutputs(x, labels, weights, training=False)
+
+    # Summen über alle Replikate -> die Losses sind bereits durch die globale Batchgröße geteilt
+    @tf.function
+    def distributedStep(step, batch):
+        outputs = strategy.run(step, args=batch)
+        return {key: strategy.reduce(tf.distribute.ReduceOp.SUM, value, axis=None) for key, value in outputs.items()}
+
+    def runEpoch(step, iterator, steps, prefix=''):
+        totals = {}
+        for batch in range(steps):
+            if not prefix:
+                callback_list.on_train_batch_begin(batch)
+            for key, value in distributedStep(step, next(iterator)).items():
+                totals[key] = totals.get(key, 0.0) + float(value)
+            if not prefix:
+                callback_list.on_train_batch_end(batch)
+        logs = {f'{prefix}loss': totals.get('loss', 0.0) / max(steps, 1)}
+        for name in losses:
+            # Bei nur einem Kopf ohne Namen des Kopfes, wie bei fit
+            head = '' if len(losses) == 1 else f'{name}_'
+            if len(losses) > 1:
+                logs[f'{prefix}{head}loss'] = totals.get(f'{name}_loss', 0.0) / max(steps, 1)
+            logs[f'{prefix}{head}accuracy'] = totals.get(f'{name}_correct', 0.0) / max(totals.get(f'{name}_weight', 0.0), 1e-8)
+        return logs
+
+    # Variablen des Optimizers im Scope anlegen, nicht erst im ersten Schritt
+    if not model.optimizer.built:
+        with strategy.scope():
+            model.optimizer.build(model.trainable_variables)
+    history = tf.keras.callbacks.History()
+    callback_list = tf.keras.callbacks.CallbackList([*callbacks, history], model=model)
+    train_iterator = iter(strategy.experimental_distribute_dataset(train_ds))
+    # Early Stopping setzt model.stop_training
+    model.stop_training = False
+    callback_list.on_train_begin()
+    for epoch in range(initial_epoch, epochs):
+        callback_list.on_epoch_begin(epoch)
+        logs = runEpoch(trainStep, train_iterator, steps_per_epoch)
+        logs.update(runEpoch(testStep, iter(strategy.experimental_distribute_dataset(val_ds)), validation_steps, prefix='val_'))
+        if isChief():
+            print(f"Epoche {epoch + 1}/{epochs}: " + ', '.join(f"{key}={value:.4f}" for key, value in logs.items()))
+        callback_list.on_epoch_end(epoch, logs)
+        if model.stop_training:
+            break
+    callback_list.on_train_end()
+    return history
+
+
+# Warten, bis alle Worker diesen Punkt erreicht haben -> z.B. bevor ein Worker nach dem Speichern beendet wird
+def workerBarrier(strategy):
+    if strategy is None:
+        return
+
+    @tf.function
+    def barrier():
+        return strategy.reduce(tf.distribute.ReduceOp.SUM, strategy.run(lambda: tf.constant(1.0)), axis=None)
+    barrier()
@@ -0,0 +1,60 @@
+import hashlib
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from FileEditing.pcmCache import fileHash, audioKey
+from Training.dataPipeline import datasetTargets, shuffledDataset
+
+# Cache der Embeddings des eingefrorenen BirdNET-Backbones -> pro Basismodell ein Unterordner, pro Ausschnitt eine .npy-Datei
+EMBEDDING_CACHE_DIR = '../cache/embeddings'
+
+
+# Ordner der Embeddings eines Basismodells -> Schlüssel aus dem Hash des Modells, der Vorverarbeitung (Sampling Rate, Länge) und der Genauigkeit
+def embeddingDir(model_path, sr, samples, precision='', cache_dir=EMBEDDING_CACHE_DIR):
+    key = hashlib.sha256(f"{fileHash(model_path)}_{sr}_{samples}{'_' + precision if precision else ''}".encode('utf-8')).hexdigest()[:32]
+    path = os.path.join(cache_dir, key)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# Modell bis zur vorletzten Schicht -> liefert die Embeddings, auf denen der neue Dense-Layer trainiert wird
+def backboneModel(model):
+    return tf.keras.Model(inputs=model.input, outputs=model.layers[-2].output)
+
+
+# Embeddings aller Dateien -> aus dem Cache oder einmalig mit dem Backbone berechnet (im Inferenzmodus, in Batches)
+def cachedEmbeddings(backbone, file_paths, load, cache_dir, batch_size=64):
+    start = time.perf_counter()
+    paths = [os.path.join(cache_dir, f"{audioKey(file_path)}.npy") for file_path in file_paths]
+    embeddings = [None] * len(file_paths)
+    missing = []
+    for i, path in enumerate(paths):
+        try:
+            embeddings[i] = np.load(path)
+        except (FileNotFoundError, ValueError):
+            missing.append(i)
+
+    for batch_start in range(0, len(missing), batch_size):
+        rows = missing[batch_start:batch_start + batch_size]
+        batch = np.stack([load(file_paths[i]) for i in rows]).astype(np.float32)
+        outputs = np.asarray(backbone.predict_on_batch(batch), dtype=np.float32)
+        for i, output in zip(rows, outputs):
+            embeddings[i] = output
+            # Atomar schreiben -> parallele Trainings sehen nie eine halbe Datei
+            tmp_path = f"{paths[i]}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, output)
+            os.replace(tmp_path, paths[i])
+
+    print(f"Embeddings: {len(file_paths) - len(missing)} aus dem Cache, {len(missing)} berechnet in {time.perf_counter() - start:.1f}s")
+    return np.stack(embeddings) if embeddings else np.zeros((0,) + tuple(backbone.output.shape[1:]), dtype=np.float32)
+
+
+# Datensatz aus Embeddings -> vollständig im Speicher, da jedes Embedding nur wenige KB groß ist
+def embeddingDataset(embeddings, labels, batch_size, is_training, skip_batches=0):
+    if is_training:
+        dataset = shuffledDataset((embeddings,) + datasetTargets(labels), len(embeddings), skip=skip_batches * batch_size)
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((embeddings,) + datasetTargets(labels))
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,163 @@
+import contextlib
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Messwerte eines Trainingslaufs (Stufen, Datensatz, Durchsatz, Profiler) als JSON-Bericht
+RUN_REPORT = os.getenv('runReport', '1') == '1'
+RUN_REPORT_DIR = os.getenv('runReportDir', '../models/reports')
+# Anzahl Batches, die vor dem Training einmal probeweise nur aus dem Datensatz gelesen werden -> Durchsatz der Eingabe ohne Modell (0 schaltet das aus)
+DATASET_STATS_STEPS = int(os.getenv('datasetStatsSteps', '10'))
+# Trace des TensorFlow-Profilers für einen Bereich von Trainingsschritten, z.B. "10,20" (über alle Epochen gezählt, ab 1) -> leer schaltet das aus
+PROFILE_STEPS = tuple(int(value) for value in os.getenv('profileSteps', '').split(',') if value.strip())
+PROFILE_DIR = os.getenv('profileDir', os.path.join(RUN_REPORT_DIR, 'profile'))
+
+# Messwerte des aktuellen Laufs -> Stufen werden über alle Module hinweg gesammelt
+_stages = {}
+_sections = {}
+
+
+# Zeitmessung einer Stufe (z.B. Dateien suchen, Dekodieren, Modell laden) -> mehrfach aufgerufene Stufen werden aufsummiert
+@contextlib.contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = _stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+        entry['seconds'] += time.perf_counter() - start
+        entry['count'] += 1
+
+
+# Weitere Werte für den Bericht (z.B. Datensatz, Einstellungen) unter einem eigenen Abschnitt
+def record(section, values):
+    _sections.setdefault(section, {}).update(values)
+
+
+# Bericht zurücksetzen -> z.B. zwischen zwei Trainings im selben Prozess
+def resetReport():
+    _stages.clear()
+    _sections.clear()
+
+
+# Bericht als JSON schreiben -> ohne Pfad unter runReportDir mit Zeitstempel
+def writeReport(name, path=None):
+    if path is None:
+        os.makedirs(RUN_REPORT_DIR, exist_ok=True)
+        path = os.path.join(RUN_REPORT_DIR, f"{name}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    report = {'name': name, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': _stages, **_sections}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"Bericht gespeichert unter: {path}")
+    return path
+
+
+# Kennzahlen einer Liste von Zeiten in Sekunden -> Millisekunden
+def timingSummary(seconds):
+    if not seconds:
+        return {}
+    values = np.array(seconds) * 1000
+    return {'mean_ms': float(values.mean()), 'p50_ms': float(np.percentile(values, 50)),
+            'p90_ms': float(np.percentile(values, 90)), 'max_ms': float(values.max())}
+
+
+# Durchsatz der Eingabe ohne Modell -> misst ein Probelesen der ersten steps Batches aus einem neuen Iterator
+# Das sind keine Statistiken von tf.data selbst: nur Zeit bis zum ersten Batch und Wartezeit/Durchsatz der folgenden Batches
+# Die Laufzeit der einzelnen tf.data-Stufen während des Trainings zeigt der Trace von ProfileSteps (TensorBoard, Input-Pipeline-Analyse)
+# Liefert der Datensatz weniger Batches pro Sekunde als das Training Schritte rechnet, wartet das Training auf die Daten
+def datasetStats(dataset, steps=DATASET_STATS_STEPS, batch_size=None):
+    if steps <= 0:
+        return {}
+    iterator = iter(dataset)
+    waits = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        try:
+            next(iterator)
+        except StopIteration:
+            break
+        waits.append(time.perf_counter() - start)
+    # Der erste Batch enthält das Füllen der Puffer (Shuffle, Prefetch) und zählt nicht zum Durchsatz
+    timed = waits[1:] or waits
+    stats = {'method': 'probe_read', 'batches': len(waits), 'first_batch_seconds': waits[0] if waits else None,
+             'batches_per_second': len(timed) / sum(timed) if timed and sum(timed) > 0 else None, 'wait': timingSummary(timed)}
+    if batch_size and stats['batches_per_second']:
+        stats['samples_per_second'] = stats['batches_per_second'] * batch_size
+    return stats
+
+
+# Dauer jedes Trainingsschritts und Samples pro Sekunde pro Epoche
+# Der erste Schritt des Trainings enthält das Tracing/Kompilieren und wird getrennt ausgewiesen
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+        self.epochs = []
+        self.first_step_seconds = None
+        self.steps = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.steps = []
+        self.epoch_start = time.perf_counter()
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        seconds = time.perf_counter() - self.step_start
+        if self.first_step_seconds is None:
+            self.first_step_seconds = seconds
+        else:
+            self.steps.append(seconds)
+
+    def on_epoch_end(self, epoch, logs=None):
+        step_seconds = sum(self.steps)
+        self.epochs.append({'epoch': epoch + 1, 'seconds': time.perf_counter() - self.epoch_start, 'steps': len(self.steps),
+                            'samples_per_second': len(self.steps) * self.batch_size / step_seconds if step_seconds > 0 else None,
+                            'step': timingSummary(self.steps)})
+
+    def summary(self):
+        # Gesamtwerte ohne die erste Epoche, falls es mehrere gibt (Aufwärmen der Datensätze)
+        epochs = self.epochs[1:] or self.epochs
+        rates = [epoch['samples_per_second'] for epoch in epochs if epoch['samples_per_second']]
+        return {'batch_size': self.batch_size, 'first_step_seconds': self.first_step_seconds,
+                'samples_per_second': float(np.mean(rates)) if rates else None, 'epochs': self.epochs}
+
+
+# Trace des Profilers für die Trainingsschritte start bis end -> Auswertung mit TensorBoard (Profile-Plugin)
+class ProfileSteps(tf.keras.callbacks.Callback):
+    def __init__(self, steps=PROFILE_STEPS, log_dir=PROFILE_DIR):
+        super().__init__()
+        self.start, self.end = (steps[0], steps[-1]) if steps else (None, None)
+        self.log_dir = log_dir
+        self.step = 0
+        self.active = False
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.step += 1
+        if self.step == self.start:
+            os.makedirs(self.log_dir, exist_ok=True)
+            tf.profiler.experimental.start(self.log_dir)
+            self.active = True
+
+    def on_train_batch_end(self, batch, logs=None):
+        if self.active and self.step >= self.end:
+            self.stop()
+
+    def on_train_end(self, logs=None):
+        if self.active:
+            self.stop()
+
+    def stop(self):
+        tf.profiler.experimental.stop()
+        self.active = False
+        print(f"Profiler-Trace der Schritte {self.start}-{self.end} gespeichert unter: {self.log_dir}")
+
+    def summary(self):
+        return {'steps': [self.start, self.end], 'log_dir': os.path.abspath(self.log_dir)} if self.start else {}
@@ -0,0 +1,120 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen (z.B. distributedTolerance und scalingEpochs)
+load_dotenv()
+
+# Verteiltes Training mit mehreren lokalen Workern (MultiWorkerMirroredStrategy über localhost)
+# Jeder Worker ist ein eigener Prozess mit TF_CONFIG -> die Gradienten werden nach jedem Schritt über alle Worker gemittelt
+# Aufruf aus dem Ordner Training:
+#   python launchWorkers.py 4 [trainConfig.json]                  -> Training mit 4 Workern
+#   python launchWorkers.py --scaling 1,2,4,8 [trainConfig.json]  -> Skalierungsbericht
+# Maximale Abweichung der Validierungsgenauigkeit zum Einzelprozess im Skalierungsbericht
+TOLERANCE = float(os.getenv('distributedTolerance', '0.02'))
+# Anzahl Epochen pro Lauf im Skalierungsbericht -> die erste Epoche enthält das Kompilieren und zählt nicht zu den Schritten pro Sekunde
+EPOCHS = int(os.getenv('scalingEpochs', '3'))
+
+
+# Freie Ports auf localhost -> alle Sockets bleiben offen, bis alle Ports bestimmt sind
+def freePorts(count):
+    sockets = []
+    for _ in range(count):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(('localhost', 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+# Umgebung eines Workers -> TF_CONFIG mit dem Cluster und dem eigenen Index, die Kerne werden auf die Worker aufgeteilt
+def workerEnv(index, ports, settings=None):
+    env = dict(os.environ, **(settings or {}))
+    if len(ports) > 1:
+        cluster = {'worker': [f'localhost:{port}' for port in ports]}
+        env['TF_CONFIG'] = json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+    else:
+        env.pop('TF_CONFIG', None)
+    env.setdefault('intraOpThreads', str(max(1, (os.cpu_count() or 1) // len(ports))))
+    return env
+
+
+# Startet die Worker und wartet auf alle -> bricht ein Worker ab, werden die anderen beendet (sie würden sonst auf ihn warten)
+def launch(workers, args, settings=None):
+    ports = freePorts(workers)
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), *args], env=workerEnv(index, ports, settings))
+                 for index in range(workers)]
+    failed = None
+    try:
+        for index, process in enumerate(processes):
+            if process.wait() != 0:
+                failed = index
+                break
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+                process.wait()
+    if failed is not None:
+        raise RuntimeError(f"Worker {failed} ist mit Code {processes[failed].returncode} abgebrochen")
+
+
+# Training in einem Worker -> ohne output_dir mit den Pfaden aus der Konfiguration
+def runWorker(config_path, output_dir=None, result_path=None):
+    from Training.trainEngine import trainHeads, writeResult
+    from Training.distributed import isChief
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if output_dir:
+        config['epochs'] = EPOCHS
+        for head in config['heads']:
+            head['output'] = os.path.join(output_dir, f"{head['name']}.keras")
+            head['test_files'] = os.path.join(output_dir, f"{head['name']}_test_files.txt")
+    result = trainHeads(config)
+    if result_path and isChief():
+        writeResult(result, result_path)
+
+
+# Skalierungsbericht: gleiche Konfiguration mit 1, 2, 4, ... Workern -> 1 Worker ist das Training im Einzelprozess ohne Strategie
+def scalingReport(counts, config_path):
+    rows = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for workers in counts:
+            print(f"Lauf mit {workers} Worker(n)")
+            result_path = os.path.join(output_dir, f'result_{workers}.json')
+            # Feste Anzahl Epochen ohne Checkpoints -> jeder Lauf beginnt neu
+            launch(workers, ['--worker', config_path, output_dir, result_path], {'checkpointEvery': '0', 'earlyStoppingPatience': '0'})
+            with open(result_path, 'r', encoding='utf-8') as f:
+                rows.append((workers, json.load(f)))
+
+    print(f"{'Worker':>6}{'Batch':>7}{'Schritte/s':>12}{'Samples/s':>11}{'Speedup':>9}{'Effizienz':>11}  Genauigkeit (Validierung)")
+    baseline = None
+    reference = None
+    for workers, result in rows:
+        # Schritte pro Sekunde ohne die erste Epoche (Kompilieren, Aufwärmen der Datensätze)
+        timed = result['epoch_seconds'][1:] or result['epoch_seconds']
+        steps_per_second = result['steps_per_epoch'] * len(timed) / sum(timed)
+        samples_per_second = steps_per_second * result['batch_size']
+        accuracy = {key: values[-1] for key, values in result['history'].items() if key.startswith('val_') and key.endswith('accuracy')}
+        if baseline is None:
+            baseline, reference = samples_per_second, accuracy
+        speedup = samples_per_second / baseline
+        deviation = max((abs(value - reference[key]) for key, value in accuracy.items()), default=0.0)
+        status = 'ok' if deviation <= TOLERANCE else f'Abweichung {deviation:.3f} > {TOLERANCE}'
+        print(f"{workers:>6}{result['batch_size']:>7}{steps_per_second:>12.2f}{samples_per_second:>11.1f}{speedup:>9.2f}{speedup / workers:>11.0%}  "
+              f"{', '.join(f'{key}={value:.3f}' for key, value in accuracy.items())}  ({status})")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        runWorker(*sys.argv[2:5])
+    elif len(sys.argv) > 2 and sys.argv[1] == '--scaling':
+        scalingReport([int(value) for value in sys.argv[2].split(',')], sys.argv[3] if len(sys.argv) > 3 else os.getenv('trainConfig', 'trainConfig.json'))
+    else:
+        launch(int(sys.argv[1]) if len(sys.argv) > 1 else 2, ['--worker', sys.argv[2] if len(sys.argv) > 2 else os.getenv('trainConfig', 'trainConfig.json')])
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import tensorflow as tf
+from dotenv import load_dotenv
+from models.BirdNETModels.MelSpecLayerSimple import MelSpecLayerSimple
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv der aufrufenden Skripte
+load_dotenv()
+
+# Trainings- und Vorhersageschritte mit XLA kompilieren
+JIT_COMPILE = os.getenv('jitCompile', '0') == '1'
+# Mixed Precision für das Backbone, z.B. 'mixed_bfloat16' -> leer bedeutet float32
+MIXED_PRECISION = os.getenv('mixedPrecision', '')
+# Threads für parallele Operationen (inter) und innerhalb einer Operation (intra) -> 0 überlässt die Wahl TensorFlow
+INTER_OP_THREADS = int(os.getenv('interOpThreads', '0'))
+INTRA_OP_THREADS = int(os.getenv('intraOpThreads', '0'))
+
+
+# Thread-Pools von TensorFlow festlegen -> muss vor der ersten Operation aufgerufen werden
+def configureThreads(inter=INTER_OP_THREADS, intra=INTRA_OP_THREADS):
+    if inter:
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+    if intra:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+
+
+# Prüfen, ob die CPU bfloat16 nativ unterstützt (AVX512_BF16 oder AMX) -> außerhalb von Linux unbekannt (None)
+def bf16Supported():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = f.read()
+    except OSError:
+        return None
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+# Kopie des Modells mit Mixed Precision -> die Gewichte bleiben float32, gerechnet wird in bfloat16
+# MelSpecLayerSimple bleibt in float32, da STFT und Normalisierung in bfloat16 zu ungenau sind
+def mixedPrecisionModel(model, policy=MIXED_PRECISION):
+    if not policy:
+        return model
+    if policy == 'mixed_bfloat16' and bf16Supported() is False:
+        print("Warnung: die CPU unterstützt bfloat16 nicht nativ, das Training wird vermutlich langsamer")
+
+    def clone(layer):
+        config = layer.get_config()
+        if not isinstance(layer, MelSpecLayerSimple):
+            config['dtype'] = policy
+        return layer.__class__.from_config(config)
+
+    mixed = tf.keras.models.clone_model(model, clone_function=clone)
+    mixed.set_weights(model.get_weights())
+    for layer in mixed.layers:
+        layer.trainable = False
+    return mixed
+
+
+# Dauer jeder Epoche -> Grundlage für Schritte pro Sekunde im Benchmark
+class EpochTimer(tf.keras.callbacks.Callback):
+    def __init__(self):
+        super().__init__()
+        self.epoch_seconds = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self.start)
@@ -0,0 +1,159 @@
+import csv
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+# Einstellungen aus der .env -> werden beim Import gelesen, also vor dem load_dotenv von trainEngine
+load_dotenv()
+
+# Hyperparameter-Suche für den Kopf eines Modells -> alle Trials trainieren auf denselben zwischengespeicherten Embeddings
+# Die Trials laufen parallel in eigenen Prozessen, schlechte Trials werden nach dem Median-Verfahren früh abgebrochen
+# Aufruf aus dem Ordner Training: python sweep.py [sweepSpace.json]
+SWEEP_DIR = '../models/sweeps'
+# Anzahl paralleler Prozesse -> die Threads von TensorFlow werden auf die Prozesse aufgeteilt
+sweepWorkers = int(os.getenv('sweepWorkers', str(os.cpu_count() or 1)))
+COLUMNS = ['trial', 'status', 'best_accuracy', 'best_epoch', 'epochs', 'seconds', 'learning_rate', 'batchSize', 'dropout', 'l1', 'l2', 'bias_l2', 'activity_l2', 'train_fraction']
+
+# Daten und Abbruchkriterium im Worker -> werden einmal pro Prozess im Initializer gesetzt
+_features = None
+_shared = None
+_lock = None
+_pruning = None
+
+
+# Einen Wert aus dem Suchraum ziehen -> choice, uniform, loguniform oder ein fester Wert
+def sampleValue(spec, rng):
+    if not isinstance(spec, dict):
+        return spec
+    if spec['type'] == 'choice':
+        return rng.choice(spec['values'])
+    if spec['type'] == 'uniform':
+        return rng.uniform(spec['low'], spec['high'])
+    if spec['type'] == 'loguniform':
+        return math.exp(rng.uniform(math.log(spec['low']), math.log(spec['high'])))
+    raise ValueError(f"Unbekannter Typ im Suchraum: {spec['type']}")
+
+
+def sampleTrials(space, trials, seed=42):
+    rng = random.Random(seed)
+    return [{'trial': i, **{name: sampleValue(spec, rng) for name, spec in space.items()}} for i in range(trials)]
+
+
+def initWorker(features_path, shared, lock, pruning, threads):
+    global _features, _shared, _lock, _pruning
+    from Training.performance import configureThreads
+    # Ein Inter-Op-Thread pro Prozess, die Kerne werden auf die parallelen Trials aufgeteilt
+    configureThreads(1, threads)
+    with np.load(features_path) as data:
+        _features = {key: data[key] for key in data.files}
+    _shared, _lock, _pruning = shared, lock, pruning
+
+
+# Median-Abbruch: nach den Aufwärm-Epochen wird ein Trial abgebrochen, wenn seine Genauigkeit unter dem Median
+# der anderen Trials in derselben Epoche liegt (erst ab startup_trials Vergleichswerten)
+def shouldPrune(epoch, accuracy):
+    with _lock:
+        others = list(_shared.get(epoch, []))
+        _shared[epoch] = others + [accuracy]
+    if epoch + 1 < _pruning.get('warmup_epochs', 3) or len(others) < _pruning.get('startup_trials', 5):
+        return False
+    return accuracy < float(np.median(others))
+
+
+def runTrial(trial):
+    import tensorflow as tf
+    from Training.trainEngine import headLayers, LEARNING_RATE, batchSize
+    from Training.performance import JIT_COMPILE
+    start = time.perf_counter()
+    tf.keras.utils.set_random_seed(42)
+
+    indices = trial.pop('indices')
+    x_train = _features['train'][indices]
+    y_train = _features['y_train'][indices]
+    x_val, y_val = _features['val'], _features['y_val']
+    hyperparameters = {key: trial[key] for key in ['dropout', 'l1', 'l2', 'bias_l2', 'activity_l2'] if key in trial}
+
+    inputs = tf.keras.Input(shape=x_train.shape[1:])
+    dropout, dense = headLayers(int(_features['num_classes']), **hyperparameters)
+    model = tf.keras.Model(inputs=inputs, outputs=dense(dropout(inputs)))
+    model.compile(optimizer=tf.keras.optimizers.Lion(learning_rate=trial.get('learning_rate', LEARNING_RATE)),
+                  loss='sparse_categorical_crossentropy', metrics=['accuracy'], jit_compile=JIT_COMPILE)
+
+    status = 'complete'
+    accuracies = []
+    for epoch in range(int(_features['max_epochs'])):
+        model.fit(x_train, y_train, batch_size=int(trial.get('batchSize', batchSize)), epochs=1, shuffle=True, verbose=0)
+        _, accuracy = model.evaluate(x_val, y_val, batch_size=256, verbose=0)
+        accuracies.append(accuracy)
+        if shouldPrune(epoch, accuracy):
+            status = 'pruned'
+            break
+
+    best_epoch = int(np.argmax(accuracies))
+    return {**trial, 'status': status, 'best_accuracy': accuracies[best_epoch], 'best_epoch': best_epoch + 1,
+            'epochs': len(accuracies), 'seconds': time.perf_counter() - start}
+
+
+def main(space_path):
+    from Training.trainEngine import resolveHeads, splitHead, selectFraction, embedFiles, EPOCHS
+    from Training.baseModel import loadBaseModel
+    from Training.performance import mixedPrecisionModel
+
+    with open(space_path, 'r', encoding='utf-8') as f:
+        sweep = json.load(f)
+    head = resolveHeads({'heads': [sweep['head']]})[0]
+    start = time.perf_counter()
+
+    # Embeddings einmal berechnen (oder aus dem Embedding-Cache lesen) -> alle Trials teilen sich diese Daten
+    X_train, X_val, y_train, y_val = splitHead(head)
+    train_embeddings, val_embeddings = embedFiles(mixedPrecisionModel(loadBaseModel()), X_train, X_val)
+
+    trials = sampleTrials(sweep['space'], sweep.get('trials', 50), sweep.get('seed', 42))
+    # Auswahl der Trainingsdaten pro Anteil einmal bestimmen -> gleiche Auswahl wie train_fraction im Training
+    fractions = {}
+    for trial in trials:
+        fraction = trial.get('train_fraction', 1.0)
+        if fraction not in fractions:
+            fractions[fraction] = selectFraction(list(range(len(y_train))), y_train, fraction)[0]
+        trial['indices'] = fractions[fraction]
+
+    workers = max(1, min(sweepWorkers, len(trials)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        features_path = os.path.join(tmp_dir, 'features.npz')
+        np.savez(features_path, train=train_embeddings, y_train=np.array(y_train, dtype=np.int32), val=val_embeddings,
+                 y_val=np.array(y_val, dtype=np.int32), num_classes=len(head['label_names']), max_epochs=sweep.get('max_epochs', EPOCHS))
+        # spawn -> die Worker starten ohne den bereits initialisierten TensorFlow-Zustand des Hauptprozesses
+        context = multiprocessing.get_context('spawn')
+        with context.Manager() as manager:
+            shared = manager.dict()
+            lock = manager.Lock()
+            with context.Pool(workers, initializer=initWorker, initargs=(features_path, shared, lock, sweep.get('pruning', {}), threads)) as pool:
+                for row in pool.imap_unordered(runTrial, trials):
+                    rows.append(row)
+                    print(f"Trial {row['trial']} ({len(rows)}/{len(trials)}): {row['status']}, Genauigkeit {row['best_accuracy']:.3f} nach {row['epochs']} Epochen")
+
+    rows.sort(key=lambda row: row['best_accuracy'], reverse=True)
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    results_path = os.path.join(SWEEP_DIR, f"{head['birdName']}_{head['name']}_sweep.csv")
+    with open(results_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    pruned = sum(row['status'] == 'pruned' for row in rows)
+    print(f"{len(rows)} Trials ({pruned} abgebrochen) in {time.perf_counter() - start:.1f}s mit {workers} Prozessen, Ergebnisse unter {results_path}")
+    for row in rows[:5]:
+        print({key: row.get(key) for key in COLUMNS})
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else 'sweepSpace.json')
@@ -0,0 +1,476 @@
+from FileEditing.pcmCache import loadPCM
+from FileEditing.segmentIndex import readSegmentIndex
+from FileEditing.modelLabels import writeClassNames
+from Training.dataPipeline import streamingDataset, shuffledDataset, mapBatches, reportDataset
+from Training.embeddingCache import embeddingDir, backboneModel, cachedEmbeddings, embeddingDataset
+from Training.baseModel import MODEL_PATH, loadBaseModel
+from Training.performance import JIT_COMPILE, MIXED_PRECISION, configureThreads, mixedPrecisionModel, EpochTimer
+from Training.augmentation import AUGMENT, AUGMENT_MIXUP, AUGMENT_NOISE_DIR, batchAugmentation, loadNoisePool, oneHotLabels
+from Training.distributed import distributionStrategy, strategyScope, isChief, globalBatchSize, shardDataset, distributedFit, workerBarrier
+from Training.instrumentation import RUN_REPORT, stage, record, resetReport, writeReport, datasetStats, ThroughputCallback, ProfileSteps
+from Training.checkpoints import CHECKPOINT_EVERY, EARLY_STOPPING_PATIENCE, checkpointPath, readCheckpoint, ResumableEarlyStopping, TrainingCheckpoint
+import json
+import os
+import sys
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from dotenv import load_dotenv
+from tensorflow.keras.regularizers import L1L2, L2
+import random
+import time
+
+# Modul random (Shuffeling), numpy und Tensorflow wird ein Random Seed gesetzt, damit die Ergebnisse reproduzierbar sind
+random.seed(42)
+np.random.seed(42)
+tf.random.set_seed(42)
+
+load_dotenv()
+# Thread-Pools festlegen, bevor TensorFlow die erste Operation ausführt (interOpThreads, intraOpThreads in der .env)
+configureThreads()
+
+birdName = os.getenv('birdName')
+
+# Parameter
+# Sampling Rate
+SR = 32000
+# Dauer der Audiodateien in Sekunden -> 3 Sekunden konnte nicht verwendet werden
+DURATION = 4.5
+# Anzahl Samples pro Audiodatei
+SAMPLES = int(SR * DURATION)
+# BatchSize
+batchSize = 16
+# Anzahl Epochen
+EPOCHS = 20
+# Ausschnitte aus dem Segment-Index statt aus einzelnen WAV-Dateien laden (siehe shortenFilesIntoSegments.py)
+SEGMENT_INDEX = os.getenv('segmentIndex', '0') == '1'
+# Aufbau der Datensätze: 'memory' lädt alle Audiodateien vorab in ein Array, 'streaming' lädt sie während des Trainings
+DATASET_MODE = os.getenv('datasetMode', 'memory')
+# Im Streaming-Modus die Trainingsdaten nach der ersten Epoche auf der Festplatte zwischenspeichern
+DATASET_CACHE = os.getenv('datasetCache', '0') == '1'
+# Nur die neuen Dense-Layer auf zwischengespeicherten Embeddings des eingefrorenen Backbones trainieren
+EMBEDDING_CACHE = os.getenv('embeddingCache', '0') == '1'
+
+
+# Hyperparameter eines Kopfes, die in der Konfiguration gesetzt werden können (Standardwerte siehe headLayers)
+HEAD_HYPERPARAMETERS = ['dropout', 'l1', 'l2', 'bias_l2', 'activity_l2']
+# Lernrate des Optimizers
+LEARNING_RATE = 0.0001
+
+
+# Pfade eines Kopfes -> bei einem einzelnen Kopf die bisherigen Pfade, bei mehreren Köpfen mit dem Namen des Kopfes als Zusatz
+def modelPath(bird, name=None):
+    suffix = f"_{name}" if name else ''
+    return f'../models/trainedModels/birdnet_finetuned_callTypes_{bird}{suffix}.keras'
+
+
+def testFilesPath(bird, name=None):
+    suffix = f"_{name}" if name else ''
+    return f'../models/test_files/{bird}{suffix}_test_files.txt'
+
+
+# Konfiguration vervollständigen -> jeder Kopf hat name, birdName, label_names, balanced, train_fraction, output und test_files
+# balanced: true kürzt alle Klassen auf die kleinste, "oversample" wiederholt Dateien kleinerer Klassen im Training, false lässt die Daten unverändert
+def resolveHeads(config):
+    heads = []
+    multiple = len(config['heads']) > 1
+    for head in config['heads']:
+        bird = head.get('birdName', config.get('birdName', birdName))
+        name = head['name']
+        heads.append({
+            'name': name,
+            'birdName': bird,
+            'label_names': list(head['label_names']),
+            'balanced': head.get('balanced', True),
+            # Anteil der Trainingsdaten pro Klasse, z.B. 0.25, 0.5 oder 0.75
+            'train_fraction': head.get('train_fraction', 1.0),
+            'hyperparameters': {key: head[key] for key in HEAD_HYPERPARAMETERS if key in head},
+            'output': head.get('output', modelPath(bird, name if multiple else None)),
+            'test_files': head.get('test_files', testFilesPath(bird, name if multiple else None)),
+        })
+    if len({head['name'] for head in heads}) != len(heads):
+        raise ValueError("Die Namen der Köpfe müssen eindeutig sein")
+    return heads
+
+
+# Funktion mit der die Daten passend vorbereitet werden
+# Eigener Zufallsgenerator pro Kopf -> jeder Kopf erhält dieselbe Auswahl wie bei einem eigenen Training
+# Mit balanced="oversample" bleiben alle Dateien erhalten, ausgeglichen wird erst nach dem Split (siehe oversample)
+def prepare_data(birdDir, label_names, balanced=True):
+    rng = random.Random(42)
+    file_paths_per_class = {}
+    # Label werden zu Indizes umgewandelt weil "sparse_categorical_crossentropy" nur mit numerischen Labels arbeiten kann
+    label_to_idx = {label: idx for idx, label in enumerate(label_names)}
+
+    if SEGMENT_INDEX:
+        # Ausschnitte aus dem Index lesen -> Verweise "Pfad#Start_Ende" werden von load_audio wie Dateipfade geladen
+        for label, ref in readSegmentIndex(birdDir):
+            if label in label_to_idx:
+                file_paths_per_class.setdefault(label, []).append(ref)
+
+    # Durchlaufe alle Klassen und sammle die Dateipfade
+    for label in ([] if SEGMENT_INDEX else label_names):
+        # Verzeichnis für die Klasse wird gesucht
+        class_dir = os.path.join(birdDir, label)
+        for file in os.listdir(class_dir):
+            # alle Dateien mit der Endung .wav werden gesammelt und an das Dictionary file_paths_per_class angefügt (key: label, value: Filepaths)
+            if file.endswith(".wav"):
+                if label not in file_paths_per_class:
+                    file_paths_per_class[label] = []
+                file_paths_per_class[label].append(os.path.join(class_dir, file))
+
+    if balanced is True:
+        # Anzahl der kleinsten Klasse ermitteln
+        min_label, min_count = min(((label, len(files)) for label, files in file_paths_per_class.items()), key=lambda x: x[1])
+        print(f"Minimale Anzahl an Dateien: {min_count} (Klasse: {min_label})")
+
+        for label in label_names:
+            # Shuffeln der Dateipfade für jede Klasse
+            rng.shuffle(file_paths_per_class[label])
+            # Jede Klasse auf die minimale Anzahl kürzen
+            file_paths_per_class[label] = file_paths_per_class[label][:min_count]
+
+    file_paths = []
+    labels = []
+    for label in label_names:
+        # Dictionary file_paths_per_class wird durchlaufen und die Dateipfade und Labels werden in die Listen file_paths und labels eingefügt
+        files = file_paths_per_class[label]
+        # Die Dateipfade werden in die Liste file_paths eingefügt
+        file_paths.extend(files)
+        # Die Labels werden in die Liste labels eingefügt, wobei das Label in den entsprechenden Index umgewandelt wird -> generiert von GitHub Copilot
+        labels.extend([label_to_idx[label]] * len(files))
+
+    # Ausgabe der Anzahl der Dateien pro Klasse -> generiert von GitHub Copilot
+    print(f"Anzahl der Dateien pro Klasse: {dict((label, len(files)) for label, files in file_paths_per_class.items())}")
+    return file_paths, labels, label_names
+
+
+# Funktion zum Laden und Vorverarbeiten der Audiodateien
+def load_audio(file_path, target_len=SAMPLES):
+    # Audiodatei laden -> über den PCM-Cache, dekodiert und resampled wird nur beim ersten Zugriff
+    y = loadPCM(file_path, sr=SR)
+    # Audiodatei von 3 Sekunden auf 4,5 Sekunden verlängern oder kürzen bei Bedarf
+    if len(y) < target_len:
+        # Wenn die Audiodatei kürzer ist, wird sie mit Nullen aufgefüllt -> Padding
+        y = np.pad(y, (0, target_len - len(y)))
+    else:
+        # Wenn die Audiodatei länger ist, wird sie auf die gewünschte Länge gekürzt
+        y = y[:target_len]
+    return y
+
+
+# Training des Modells
+# labels ist entweder eine Liste von Labels oder ein Tupel (Labels pro Kopf, Gewichte pro Kopf)
+# batch_map wird auf jeden Batch angewendet (Augmentierung, one-hot Labels)
+def build_dataset(file_paths, labels, batch_size, is_training, batch_map=None, skip_batches=0):
+    if DATASET_MODE == 'streaming':
+        # Validierungsdaten werden nicht gecacht -> validation_steps liest sie nie vollständig
+        return streamingDataset(file_paths, labels, batch_size, is_training, load_audio, SAMPLES, cache=DATASET_CACHE and is_training, batch_map=batch_map, skip_batches=skip_batches)
+    # Alle Audiodateien werden geladen und in ein numpy Array umgewandelt
+    with stage('decode'):
+        audio_data = np.array([load_audio(path) for path in file_paths], dtype=np.float32)
+    # Labels werden in ein numpy Array umgewandelt
+    targets = labels if isinstance(labels, tuple) else (np.array(labels, dtype=np.int32),)
+
+    if is_training:
+        # Dataset wird gemischt und wiederholt -> jede Epoche eine feste Permutation, beim Fortsetzen werden die bereits gesehenen Batches übersprungen
+        dataset = shuffledDataset((audio_data,) + targets, len(audio_data), skip=skip_batches * batch_size)
+    else:
+        # Dataset wird erstellt aus den Audiodaten und Labels -> dieser Part wurde generiert von GitHub Copilot
+        dataset = tf.data.Dataset.from_tensor_slices((audio_data,) + targets)
+    # Dataset wird in Batches aufgeteilt
+    dataset = dataset.batch(batch_size)
+    if batch_map is not None:
+        dataset = mapBatches(dataset, batch_map, skip_batches)
+    dataset = dataset.prefetch(tf.data.AUTOTUNE)
+    return dataset
+
+
+# Neue Schichten eines Kopfes: Dropout gegen Overfitting und Dense-Schicht mit Regularizer
+def headLayers(num_classes, name='calltype_output', dropout=0.2, l1=1e-3, l2=1e-3, bias_l2=1e-4, activity_l2=1e-3):
+    # Regularizer hinzufügen
+    regularizer = L1L2(l1=l1, l2=l2)
+    dropout_layer = tf.keras.layers.Dropout(dropout)
+    dense = tf.keras.layers.Dense(num_classes, activation='softmax', name=name, kernel_regularizer=regularizer, bias_regularizer=L2(bias_l2), activity_regularizer=L2(activity_l2))
+    return dropout_layer, dense
+
+
+# Einzelnes Modell aus Basismodell und trainiertem Kopf -> gleiches Format wie bisher (Ausgabe 'calltype_output'), damit die Prediction unverändert bleibt
+# Die Klassen des Kopfes werden daneben gespeichert (modelLabels.py) -> Testing liest sie für genau dieses Modell
+def exportHead(model, dense, output_path, label_names, head_name=None):
+    # Letzte 2 Layer des Modells entfernen und durch neue Layer ersetzen
+    x = model.layers[-2].output
+    dropout, export_dense = headLayers(dense.units)
+    new_model = tf.keras.Model(inputs=model.input, outputs=export_dense(dropout(x)))
+    export_dense.set_weights(dense.get_weights())
+    new_model.save(output_path)
+    writeClassNames(output_path, label_names, head_name)
+    print(f"Modell gespeichert unter: {output_path}")
+
+
+# Embeddings mehrerer Listen von Dateien -> einmal pro Ausschnitt berechnet, Schlüssel aus Hash der Audiodaten und Hash des Basismodells
+def embedFiles(model, *file_path_lists):
+    embedding_dir = embeddingDir(MODEL_PATH, SR, SAMPLES, MIXED_PRECISION)
+    backbone = backboneModel(model)
+    backbone.compile(jit_compile=JIT_COMPILE)
+    with stage('embeddings'):
+        return [cachedEmbeddings(backbone, file_paths, load_audio, embedding_dir) for file_paths in file_path_lists]
+
+
+# Zeilen der gemeinsamen Datensätze aus den Pfaden aller Köpfe
+# Pro Kopf ein Label und ein Gewicht je Zeile -> Gewicht 0, wenn die Datei nicht zu den Daten des Kopfes gehört (maskierte Loss-Funktion)
+# Mehrfach vorkommende Dateien eines Kopfes (oversample) erhalten eigene Zeilen, die sich die Köpfe teilen
+def mergeHeads(heads, split):
+    paths = []
+    rows = {}
+    head_rows = []
+    for head in heads:
+        seen = {}
+        indices = []
+        for path in head[split][0]:
+            key = (path, seen.get(path, 0))
+            seen[path] = key[1] + 1
+            if key not in rows:
+                rows[key] = len(paths)
+                paths.append(path)
+            indices.append(rows[key])
+        head_rows.append(indices)
+    labels = {}
+    weights = {}
+    for head, indices in zip(heads, head_rows):
+        head_labels = np.zeros(len(paths), dtype=np.int32)
+        head_weights = np.zeros(len(paths), dtype=np.float32)
+        head_labels[indices] = head[split][1]
+        head_weights[indices] = 1.0
+        labels[head['name']] = head_labels
+        weights[head['name']] = head_weights
+    return paths, (labels, weights)
+
+
+# Nur einen Teil der Trainingsdaten verwenden (Training mit verschiedenen Datensatzgrößen)
+# gezielte Auswahl der Trainingsdaten, um ausgewogenen Split der Klassen zu erreichen -> pro Klasse die ersten fraction * n Dateien
+def selectFraction(X_train, y_train, fraction):
+    if fraction >= 1.0:
+        return X_train, y_train
+    selected_indices = []
+    for class_idx in np.unique(y_train):
+        # Indizes aller Elemente dieser Klasse
+        indices = [i for i, y in enumerate(y_train) if y == class_idx]
+        n = int(fraction * len(indices))
+        selected_indices.extend(indices[:n])
+
+    selected_indices.sort()
+    return [X_train[i] for i in selected_indices], [y_train[i] for i in selected_indices]
+
+
+# Kleinere Klassen der Trainingsdaten durch zufällig wiederholte Dateien auf die Größe der größten Klasse bringen
+# Nur nach dem Split -> keine Datei kann dadurch sowohl im Training als auch in der Validierung landen
+# Mit Augmentierung erhält jede Wiederholung eine andere Variante
+def oversample(X_train, y_train, seed=42):
+    rng = random.Random(seed)
+    per_class = {}
+    for path, label in zip(X_train, y_train):
+        per_class.setdefault(label, []).append(path)
+    max_count = max(len(paths) for paths in per_class.values())
+    X_train, y_train = list(X_train), list(y_train)
+    for label, paths in sorted(per_class.items()):
+        extra = rng.choices(paths, k=max_count - len(paths))
+        X_train.extend(extra)
+        y_train.extend([label] * len(extra))
+    return X_train, y_train
+
+
+# Daten eines Kopfes vorbereiten und in Training und Validierung aufteilen
+def splitHead(head):
+    print(f"Kopf {head['name']} ({head['birdName']}): {head['label_names']}")
+    # Funktion zum Vorbereiten der Daten aufrufen
+    with stage('discover'):
+        file_paths, labels, class_names = prepare_data(f"../SoundFiles/{head['birdName']}", head['label_names'], head['balanced'])
+    # Train-Test-Split der Daten -> 80% Training, 20% Test
+    X_train, X_val, y_train, y_val = train_test_split(file_paths, labels, test_size=0.20, stratify=labels, random_state=42)
+    X_train, y_train = selectFraction(X_train, y_train, head['train_fraction'])
+    if head['balanced'] == 'oversample':
+        X_train, y_train = oversample(X_train, y_train)
+
+    # Ausgabe der Anzahl der Trainingsdaten pro Klasse
+    print(f"Anzahl der Trainingsdaten pro Klasse: {dict(zip(class_names, np.bincount(y_train)))}")
+    return X_train, X_val, y_train, y_val
+
+
+# Training mehrerer Köpfe in einem Durchlauf -> ein Laden des Basismodells, ein Embedding-Durchlauf, alle Köpfe werden gemeinsam trainiert
+def trainHeads(config):
+    # Verteiltes Training, wenn TF_CONFIG gesetzt ist (launchWorkers.py) -> die Strategie muss vor allen anderen Operationen erstellt werden
+    strategy = distributionStrategy()
+    chief = isChief()
+    heads = resolveHeads(config)
+    batch_size = globalBatchSize(config.get('batchSize', batchSize), strategy)
+    epochs = config.get('epochs', EPOCHS)
+    resetReport()
+    record('settings', {'heads': [head['name'] for head in heads], 'batch_size': batch_size, 'epochs': epochs, 'dataset_mode': DATASET_MODE,
+                        'embedding_cache': EMBEDDING_CACHE, 'augment': AUGMENT, 'jit_compile': JIT_COMPILE, 'mixed_precision': MIXED_PRECISION,
+                        'workers': strategy.num_replicas_in_sync if strategy is not None else 1})
+    if strategy is not None:
+        print(f"Verteiltes Training mit {strategy.num_replicas_in_sync} Replikaten, globale Batchgröße {batch_size}")
+
+    for head in heads:
+        X_train, X_val, y_train, y_val = splitHead(head)
+
+        # Herausschreiben der Dateipfade der Testfiles für die spätere Prediction -> nur ein Worker schreibt
+        if chief:
+            with open(head['test_files'], "w") as f:
+                for path in X_val:
+                    # gesplittet durch neue Zeile
+                    f.write(path + "\n")
+        head['train'] = (X_train, y_train)
+        head['val'] = (X_val, y_val)
+
+    # Gemeinsame Datensätze aller Köpfe -> jede Datei wird nur einmal geladen
+    train_paths, train_targets = mergeHeads(heads, 'train')
+    val_paths, val_targets = mergeHeads(heads, 'val')
+
+    # Anzahl der Schritte pro Epoche und Validierungsschritte berechnen
+    steps_per_epoch = len(train_paths) // batch_size
+    validation_steps = len(val_paths) // batch_size
+
+    # Checkpoint eines unterbrochenen Trainings mit denselben Einstellungen -> die Datensätze überspringen die bereits trainierten Epochen
+    checkpoint_settings = {'heads': [{key: head[key] for key in ['name', 'label_names', 'balanced', 'train_fraction', 'hyperparameters']} for head in heads],
+                           'batch_size': batch_size, 'learning_rate': config.get('learning_rate', LEARNING_RATE), 'embedding_cache': EMBEDDING_CACHE,
+                           'dataset_mode': DATASET_MODE, 'augment': AUGMENT, 'mixed_precision': MIXED_PRECISION}
+    checkpoint_path = checkpointPath(heads[0]['birdName'], checkpoint_settings, train_paths)
+    checkpoint_state = readCheckpoint(checkpoint_path) if CHECKPOINT_EVERY > 0 else None
+    initial_epoch = checkpoint_state['epoch'] if checkpoint_state else 0
+    skip_batches = initial_epoch * steps_per_epoch
+
+    # base bleibt float32 und wird für den Export verwendet, model rechnet optional in bfloat16
+    # Im Embedding-Modus wird der Backbone nur lokal für die Embeddings genutzt -> nur die Köpfe liegen im Scope der Strategie
+    with strategyScope(None if EMBEDDING_CACHE else strategy):
+        base = loadBaseModel()
+        with stage('mixed_precision'):
+            model = mixedPrecisionModel(base)
+    x = model.layers[-2].output
+    with strategyScope(strategy):
+        for head in heads:
+            head['layers'] = headLayers(len(head['label_names']), name=head['name'], **head['hyperparameters'])
+
+    # Augmentierung nur beim Training auf Audiodaten -> im Embedding-Modus liegen nur die fertigen Embeddings vor
+    augment = AUGMENT and not EMBEDDING_CACHE
+    if AUGMENT and EMBEDDING_CACHE:
+        print("Hinweis: im Embedding-Modus (embeddingCache=1) wird nicht augmentiert")
+    use_mixup = augment and AUGMENT_MIXUP > 0
+    num_classes = {head['name']: len(head['label_names']) for head in heads}
+
+    dataset_start = time.perf_counter()
+    with stage('dataset'):
+        if EMBEDDING_CACHE:
+            train_embeddings, val_embeddings = embedFiles(model, train_paths, val_paths)
+            train_ds = embeddingDataset(train_embeddings, train_targets, batch_size, is_training=True, skip_batches=skip_batches)
+            val_ds = embeddingDataset(val_embeddings, val_targets, batch_size, is_training=False)
+            dataset_mode = 'embeddings'
+            # Im Embedding-Modus werden nur die Köpfe (Dropout + Dense) trainiert
+            inputs = tf.keras.Input(shape=x.shape[1:])
+            features = inputs
+        else:
+            train_map = batchAugmentation(SR, num_classes, loadNoisePool(AUGMENT_NOISE_DIR, SAMPLES, lambda path: loadPCM(path, sr=SR))) if augment else None
+            # Mit Mixup sind die Labels one-hot -> auch die Validierungsdaten
+            val_map = oneHotLabels(num_classes) if use_mixup else None
+            train_ds = build_dataset(train_paths, train_targets, batch_size=batch_size, is_training=True, batch_map=train_map, skip_batches=skip_batches)
+            val_ds = build_dataset(val_paths, val_targets, batch_size=batch_size, is_training=False, batch_map=val_map)
+            dataset_mode = DATASET_MODE
+            inputs = model.input
+            features = x
+    # Zeit bis zum ersten Batch und Durchsatz der Eingabe ohne Modell
+    record('dataset', reportDataset(dataset_mode, train_ds, dataset_start))
+    dataset_stats = datasetStats(train_ds, batch_size=batch_size)
+    record('dataset', {'probe': dataset_stats})
+
+    # Jeder Worker verarbeitet seinen Anteil jedes globalen Batches
+    train_ds = shardDataset(train_ds, strategy)
+    val_ds = shardDataset(val_ds, strategy)
+
+    with strategyScope(strategy), stage('compile'):
+        # Ein Modell mit einer Ausgabe pro Kopf
+        outputs = {head['name']: head['layers'][1](head['layers'][0](features)) for head in heads}
+        train_model = tf.keras.Model(inputs=inputs, outputs=outputs)
+
+        # Kompilierung
+        train_model.compile(
+            # Optimizer hinzugefügt
+            # optimizer=tf.keras.optimizers.Nadam(0.001),
+            optimizer=tf.keras.optimizers.Lion(learning_rate=config.get('learning_rate', LEARNING_RATE)),
+            # Loss-Funktion für Mehrklassenklassifikation -> mit Mixup auf gemischten one-hot Labels
+            loss={head['name']: 'categorical_crossentropy' if use_mixup else 'sparse_categorical_crossentropy' for head in heads},
+            # Genauigkeit nur über die Dateien des jeweiligen Kopfes (Gewicht 1)
+            weighted_metrics={head['name']: ['accuracy'] for head in heads},
+            # Trainings- und Vorhersageschritte mit XLA kompilieren (jitCompile in der .env)
+            jit_compile=JIT_COMPILE
+        )
+
+    # Checkpoints und Early Stopping über die trainierten Variablen der Köpfe (Dense und Zustand des Dropouts)
+    head_variables = [variable for head in heads for layer in head['layers'] for variable in layer.variables]
+    early_stopping = ResumableEarlyStopping(head_variables) if EARLY_STOPPING_PATIENCE > 0 else None
+    checkpoint = TrainingCheckpoint(checkpoint_path, head_variables, early_stopping, write=chief)
+    if checkpoint_state:
+        checkpoint.set_model(train_model)
+        with strategyScope(strategy):
+            train_model.optimizer.build(train_model.trainable_variables)
+        checkpoint.restore(checkpoint_state)
+
+    print("Starte Training...")
+
+    timer = EpochTimer()
+    # Dauer der Trainingsschritte und optional ein Trace des Profilers (profileSteps in der .env)
+    throughput = ThroughputCallback(batch_size)
+    profiler = ProfileSteps()
+    # Early Stopping vor dem Checkpoint -> sein Zustand nach der Epoche wird mitgespeichert
+    callbacks = [timer, throughput, profiler] + ([early_stopping] if early_stopping else []) + [checkpoint]
+    with stage('fit'):
+        if strategy is not None:
+            loss_fn = tf.keras.losses.categorical_crossentropy if use_mixup else tf.keras.losses.sparse_categorical_crossentropy
+            distributedFit(strategy, train_model, {head['name']: loss_fn for head in heads}, train_ds, val_ds,
+                           epochs, steps_per_epoch, validation_steps, callbacks=callbacks, initial_epoch=initial_epoch)
+        else:
+            train_model.fit(train_ds,
+                      validation_data=val_ds,
+                      epochs=epochs,
+                      steps_per_epoch=steps_per_epoch,
+                      validation_steps=validation_steps,
+                      initial_epoch=initial_epoch,
+                      callbacks=callbacks)
+
+    # Gespeichert wird pro Kopf das vollständige Modell (Backbone + trainierter Kopf) -> die Gewichte sind auf allen Workern gleich, nur ein Worker speichert
+    if chief:
+        with stage('export'):
+            for head in heads:
+                exportHead(base, head['layers'][1], head['output'], head['label_names'], head['name'])
+    workerBarrier(strategy)
+    checkpoint.remove()
+
+    # Verlauf aller Epochen, auch der vor dem Fortsetzen trainierten
+    result = {'history': checkpoint.history, 'epoch_seconds': timer.epoch_seconds, 'steps_per_epoch': steps_per_epoch,
+              'batch_size': batch_size, 'workers': strategy.num_replicas_in_sync if strategy is not None else 1}
+    # Bericht des Laufs -> Stufen, Datensatz, Durchsatz, Profiler und Verlauf der Metriken
+    summary = throughput.summary()
+    # Liefert die Eingabe allein weniger Samples pro Sekunde, als das Training verarbeitet, wartet das Training auf die Daten
+    if dataset_stats.get('samples_per_second') and summary['samples_per_second']:
+        summary['input_bound'] = dataset_stats['samples_per_second'] < summary['samples_per_second']
+    record('throughput', summary)
+    record('profile', profiler.summary())
+    record('history', checkpoint.history)
+    if RUN_REPORT and chief:
+        result['report'] = writeReport(heads[0]['birdName'])
+    return result
+
+
+# Ergebnis des Trainings als JSON speichern (trainResult in der .env) -> wird von launchWorkers.py für den Skalierungsbericht gelesen
+def writeResult(result, result_path):
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, default=float)
+
+
+# Aufruf mit einer Konfigurationsdatei -> Pfad als Argument oder über trainConfig in der .env
+if __name__ == '__main__':
+    config_path = sys.argv[1] if len(sys.argv) > 1 else os.getenv('trainConfig', 'trainConfig.json')
+    with open(config_path, 'r', encoding='utf-8') as f:
+        result = trainHeads(json.load(f))
+    if os.getenv('trainResult') and isChief():
+        writeResult(result, os.getenv('trainResult'))